@@ -3,19 +3,28 @@ import sys
 import gc
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, Response, stream_with_context, g
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
+import time
 import tempfile
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from flask_weasyprint import HTML, render_pdf
 
 from flashcard_ai.text_processor import process_text
-from flashcard_ai.flashcard_generator import generate_flashcards
+from flashcard_ai.flashcard_generator import generate_document_flashcards, stream_flashcards
 from flashcard_ai.topic_generator import generate_topic_flashcards
-from flashcard_ai.file_processor import process_files
-from models import db, User, Deck
+from flashcard_ai.batch import generate_batch, iter_batch, BATCH_MAX_DOCUMENTS
+from flashcard_ai.file_processor import process_files, spool_upload
+from flashcard_ai.jobs import submit_job, get_job, report_progress
+from flashcard_ai.cache import make_key
+from flashcard_ai.pdf_cache import get_cached_pdf, render_pdf_file
+from flashcard_ai.exporters import EXPORT_FORMATS
+from flashcard_ai.scheduler import review_card, MIN_GRADE, MAX_GRADE
+from flashcard_ai.metrics import inc, observe, start_log, finish_log, render_prometheus
+from models import db, User, Deck, Card, ensure_schema, migrate_deck_cards
 
 # Create Flask application
 app = Flask(__name__)
@@ -42,9 +51,45 @@ login_manager.login_view = 'login'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# Request metrics and structured request logs
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.request_log = start_log(method=request.method, path=request.path, endpoint=request.endpoint)
+
+@app.after_request
+def count_request(response):
+    g.response_status = response.status_code
+    inc('http_requests_total', endpoint=request.endpoint or 'unknown', method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    observe('http_request', time.perf_counter() - started, endpoint=request.endpoint or 'unknown')
+    fields = {'status': g.pop('response_status', 500)}
+    if error is not None:
+        fields['error'] = str(error)
+    try:
+        finish_log(g.pop('request_log'), **fields)
+    except (KeyError, ValueError):
+        # The log was started in a different context (e.g. a streamed response); nothing to report
+        pass
+
+@app.route('/metrics')
+def metrics():
+    """Counters and stage timing histograms in the Prometheus text format"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 # Create tables
 with app.app_context():
     db.create_all()
+    ensure_schema()
+    
+    # Move any decks still stored as a JSON blob into the Card table
+    migrate_deck_cards()
 
 # Authentication routes
 @app.route('/signup', methods=['GET', 'POST'])
@@ -118,6 +163,85 @@ def logout():
 def index():
     return render_template('index.html')
 
+def _flashcards_response(flashcards):
+    """Build the JSON payload returned by all generation endpoints"""
+    return {
+        'flashcards': flashcards,
+        'main': flashcards.get('main', []),
+        'definitions': flashcards.get('definitions', []),
+        'cloze': flashcards.get('cloze', [])
+    }
+
+def _wants_job():
+    """Whether the client asked for the request to run as a background job"""
+    return request.form.get('async') == 'true'
+
+def _job_response(job_id):
+    """Tell the client where to poll for the result of a background job"""
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id)
+    }), 202
+
+def _generate_from_text(text_input, format_type, difficulty, extract_definitions, create_cloze, question_answer, model):
+    # Process the text
+    report_progress('Processing text', 0.1)
+    processed_text = process_text(text_input, format_type)
+    
+    # Generate flashcards, chunking long input instead of truncating it
+    report_progress('Generating flashcards', 0.3)
+    flashcards = generate_document_flashcards(
+        processed_text,
+        difficulty=difficulty,
+        extract_definitions=extract_definitions,
+        create_cloze=create_cloze,
+        question_answer=question_answer,
+        model=model  # Pass model parameter
+    )
+    
+    # Force garbage collection to free memory
+    gc.collect()
+    
+    return _flashcards_response(flashcards)
+
+def _generate_from_topic(topic_input, difficulty, include_definitions, include_facts, include_dates, model):
+    # Generate flashcards from the topic
+    report_progress('Researching topic and generating flashcards', 0.1)
+    flashcards = generate_topic_flashcards(
+        topic_input,
+        difficulty=difficulty,
+        include_definitions=include_definitions,
+        include_facts=include_facts,
+        include_dates=include_dates,
+        model=model  # Pass model parameter
+    )
+    
+    # Force garbage collection to free memory
+    gc.collect()
+    
+    return _flashcards_response(flashcards)
+
+def _generate_from_files(files, difficulty, extract_all, use_ocr, model):
+    # Process files
+    report_progress('Extracting text and generating flashcards', 0.1)
+    flashcards = process_files(
+        files,
+        difficulty=difficulty,
+        extract_all=extract_all,
+        use_ocr=use_ocr,
+        model=model  # Pass model parameter
+    )
+    
+    # Force garbage collection to free memory
+    gc.collect()
+    
+    return _flashcards_response(flashcards)
+
+def _is_url_input_error(error):
+    # url_ingest is only imported once URL input arrives; if it isn't loaded it can't have raised
+    url_ingest = sys.modules.get('flashcard_ai.url_ingest')
+    return url_ingest is not None and isinstance(error, url_ingest.URLIngestError)
+
 @app.route('/generate', methods=['POST'])
 def generate():
     try:
@@ -137,36 +261,170 @@ def generate():
         if not text_input:
             return jsonify({'error': 'No text provided'}), 400
         
-        # Limit input size
-        if len(text_input) > 5000:
-            text_input = text_input[:5000]
-        
-        # Process the text
-        processed_text = process_text(text_input, format_type)
-        
-        # Generate flashcards
-        flashcards = generate_flashcards(
-            processed_text, 
+        options = dict(
+            text_input=text_input,
+            format_type=format_type,
             difficulty=difficulty,
             extract_definitions=extract_definitions,
             create_cloze=create_cloze,
             question_answer=question_answer,
-            model=model  # Pass model parameter
+            model=model
         )
         
-        # Force garbage collection to free memory
-        gc.collect()
+        if _wants_job():
+            return _job_response(submit_job('generate', _generate_from_text, **options))
         
-        return jsonify({
-            'flashcards': flashcards,
-            'main': flashcards.get('main', []),
-            'definitions': flashcards.get('definitions', []),
-            'cloze': flashcards.get('cloze', [])
-        })
+        return jsonify(_generate_from_text(**options))
     except Exception as e:
         print(f"Error in generate route: {str(e)}")
         gc.collect()  # Force garbage collection on error
+        return jsonify({'error': str(e)}), 400 if _is_url_input_error(e) else 500
+
+def _sse_event(event, data):
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/generate_stream', methods=['POST'])
+def generate_stream():
+    """Generate flashcards from text, streaming each card as a Server-Sent Event"""
+    # Get text input from the request
+    text_input = request.form.get('text_input')
+    format_type = request.form.get('format', 'plain')
+    difficulty = request.form.get('difficulty', 'easy')
+    
+    # Get advanced options
+    extract_definitions = request.form.get('extract_definitions') == 'true'
+    create_cloze = request.form.get('create_cloze') == 'true'
+    question_answer = request.form.get('question_answer', 'true') == 'true'
+    
+    # Get model selection (default to GPT-3.5)
+    model = request.form.get('model', 'gpt-3.5')
+    
+    if not text_input:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    def events():
+        flashcards = {}
+        try:
+            processed_text = process_text(text_input, format_type)
+            
+            for section, card in stream_flashcards(
+                processed_text,
+                difficulty=difficulty,
+                extract_definitions=extract_definitions,
+                create_cloze=create_cloze,
+                question_answer=question_answer,
+                model=model
+            ):
+                flashcards.setdefault(section, []).append(card)
+                yield _sse_event('card', {'section': section, 'card': card})
+            
+            yield _sse_event('done', _flashcards_response(flashcards))
+        except Exception as e:
+            print(f"Error in generate stream route: {str(e)}")
+            yield _sse_event('error', {'error': str(e)})
+        finally:
+            gc.collect()
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+    return response
+
+def _save_batch_decks(user_id, titles, results):
+    """Save every generated document as a deck in a single transaction"""
+    deck_ids = [None] * len(results)
+    decks = []
+    for index, (title, flashcards) in enumerate(zip(titles, results)):
+        if not flashcards:
+            continue
+        deck = Deck(title=title[:100], user_id=user_id)
+        deck.set_cards(flashcards)
+        db.session.add(deck)
+        decks.append((index, deck))
+    
+    db.session.commit()
+    for index, deck in decks:
+        deck_ids[index] = deck.id
+    return deck_ids
+
+@app.route('/generate_batch', methods=['POST'])
+def generate_batch_route():
+    """
+    Generate flashcards for many documents in one request
+    
+    Expects JSON: {"documents": [{"title": ..., "text": ..., "format": ...}],
+    "difficulty": ..., "model": ..., "save": true, "stream": true}. With
+    "stream" the results are sent as JSON Lines as each document finishes.
+    """
+    data = request.get_json(silent=True) or {}
+    documents = data.get('documents')
+    
+    if not isinstance(documents, list) or not documents:
+        return jsonify({'error': 'No documents provided'}), 400
+    if len(documents) > BATCH_MAX_DOCUMENTS:
+        return jsonify({'error': f"A batch can contain at most {BATCH_MAX_DOCUMENTS} documents"}), 400
+    
+    titles = []
+    texts = []
+    for index, document in enumerate(documents):
+        if isinstance(document, str):
+            document = {'text': document}
+        if not isinstance(document, dict) or not document.get('text'):
+            return jsonify({'error': f"Document {index} has no text"}), 400
+        titles.append(document.get('title') or f"Batch document {index + 1}")
+        texts.append(process_text(document['text'], document.get('format', 'plain')))
+    
+    options = {
+        'difficulty': data.get('difficulty', 'easy'),
+        'extract_definitions': bool(data.get('extract_definitions', False)),
+        'create_cloze': bool(data.get('create_cloze', False)),
+        'question_answer': bool(data.get('question_answer', True)),
+        'model': data.get('model', 'gpt-3.5')
+    }
+    
+    # Only logged-in users can save decks to their account
+    user_id = current_user.id if data.get('save') and current_user.is_authenticated else None
+    
+    def result_for(index, flashcards):
+        result = {'index': index, 'title': titles[index]}
+        if flashcards is None:
+            result['error'] = 'Failed to generate flashcards'
+        else:
+            result.update(_flashcards_response(flashcards))
+        return result
+    
+    if data.get('stream'):
+        def lines():
+            results = [None] * len(texts)
+            try:
+                for index, flashcards in iter_batch(texts, **options):
+                    results[index] = flashcards
+                    yield json.dumps(result_for(index, flashcards)) + '\n'
+                
+                if user_id is not None:
+                    yield json.dumps({'deck_ids': _save_batch_decks(user_id, titles, results)}) + '\n'
+            except Exception as e:
+                print(f"Error in generate batch route: {str(e)}")
+                yield json.dumps({'error': str(e)}) + '\n'
+            finally:
+                gc.collect()
+        
+        response = Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+        response.headers['X-Accel-Buffering'] = 'no'  # Stop proxies from buffering the stream
+        return response
+    
+    try:
+        results = generate_batch(texts, **options)
+        response = {'results': [result_for(index, flashcards) for index, flashcards in enumerate(results)]}
+        if user_id is not None:
+            response['deck_ids'] = _save_batch_decks(user_id, titles, results)
+        return jsonify(response)
+    except Exception as e:
+        print(f"Error in generate batch route: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        gc.collect()
 
 @app.route('/generate_from_topic', methods=['POST'])
 def generate_from_topic():
@@ -186,25 +444,19 @@ def generate_from_topic():
         if not topic_input:
             return jsonify({'error': 'No topic provided'}), 400
         
-        # Generate flashcards from the topic
-        flashcards = generate_topic_flashcards(
-            topic_input,
+        options = dict(
+            topic_input=topic_input,
             difficulty=difficulty,
             include_definitions=include_definitions,
             include_facts=include_facts,
             include_dates=include_dates,
-            model=model  # Pass model parameter
+            model=model
         )
         
-        # Force garbage collection to free memory
-        gc.collect()
+        if _wants_job():
+            return _job_response(submit_job('generate_from_topic', _generate_from_topic, **options))
         
-        return jsonify({
-            'flashcards': flashcards,
-            'main': flashcards.get('main', []),
-            'definitions': flashcards.get('definitions', []),
-            'cloze': flashcards.get('cloze', [])
-        })
+        return jsonify(_generate_from_topic(**options))
     except Exception as e:
         print(f"Error in topic generation route: {str(e)}")
         gc.collect()
@@ -227,29 +479,32 @@ def generate_from_files():
         if not files or len(files) == 0:
             return jsonify({'error': 'No files provided'}), 400
         
-        # Process files
-        flashcards = process_files(
-            files,
+        options = dict(
             difficulty=difficulty,
             extract_all=extract_all,
             use_ocr=use_ocr,
-            model=model  # Pass model parameter
+            model=model
         )
         
-        # Force garbage collection to free memory
-        gc.collect()
+        if _wants_job():
+            # Uploads are closed when the request ends, so spool copies for the job
+            uploads = [spool_upload(file) for file in files]
+            return _job_response(submit_job('generate_from_files', _generate_from_files, uploads, **options))
         
-        return jsonify({
-            'flashcards': flashcards,
-            'main': flashcards.get('main', []),
-            'definitions': flashcards.get('definitions', []),
-            'cloze': flashcards.get('cloze', [])
-        })
+        return jsonify(_generate_from_files(files, **options))
     except Exception as e:
         print(f"Error in file processing route: {str(e)}")
         gc.collect()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the status of a background generation job, with its result once done"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 @app.route('/flashcards')
 def flashcards():
     return render_template('flashcards.html')
@@ -271,7 +526,10 @@ def save_deck():
                 title=title,
                 user_id=current_user.id
             )
-            deck.set_cards(cards)
+            try:
+                deck.set_cards(cards)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
             db.session.add(deck)
             db.session.commit()
@@ -291,6 +549,55 @@ def save_deck():
         print(f"Error saving deck: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+PDF_BACKGROUND_MIN_CARDS = int(os.environ.get('FLASHCARD_PDF_BACKGROUND_MIN_CARDS', 150))
+PDF_JOBS_MAX = 256
+
+# Recent background PDF jobs by cache key, so repeated clicks don't queue duplicates
+_pdf_jobs = OrderedDict()
+_pdf_jobs_lock = threading.Lock()
+
+def _pending_pdf_job(cache_key):
+    """Id of the queued or running render job for a PDF, or None if a new one is needed"""
+    with _pdf_jobs_lock:
+        job_id = _pdf_jobs.get(cache_key)
+    job = get_job(job_id) if job_id else None
+    if job is not None and job['status'] in ('queued', 'running'):
+        return job_id
+    
+    # Failed, or done but its PDF has since been evicted from the cache
+    with _pdf_jobs_lock:
+        if _pdf_jobs.get(cache_key) == job_id:
+            _pdf_jobs.pop(cache_key, None)
+    return None
+
+def _remember_pdf_job(cache_key, job_id):
+    with _pdf_jobs_lock:
+        _pdf_jobs[cache_key] = job_id
+        _pdf_jobs.move_to_end(cache_key)
+        while len(_pdf_jobs) > PDF_JOBS_MAX:
+            _pdf_jobs.popitem(last=False)
+
+def _pdf_filename(title):
+    return f"{title.replace(' ', '_')}.pdf"
+
+def _send_pdf(pdf_path, filename):
+    """Send a cached PDF as a download"""
+    return send_file(pdf_path, mimetype='application/pdf', as_attachment=True, download_name=filename)
+
+def _write_pdf(html_content, target):
+    """Render HTML to a PDF file with WeasyPrint"""
+    # WeasyPrint is slow to import and most workers never render a PDF, so load it on first use
+    from flask_weasyprint import HTML
+    HTML(string=html_content).write_pdf(target)
+
+def _render_pdf_job(cache_key, html_content, base_url, deck_id):
+    """Render a deck's PDF into the cache on a background worker"""
+    # WeasyPrint resolves stylesheet URLs against the request, so recreate one
+    with app.test_request_context(base_url=base_url):
+        render_pdf_file(cache_key, lambda target: _write_pdf(html_content, target))
+        # download_deck checks the owner again and serves the PDF from the cache
+        return {'download_url': url_for('download_deck', deck_id=deck_id)}
+
 @app.route('/download_deck/<int:deck_id>')
 @login_required
 def download_deck(deck_id):
@@ -305,23 +612,47 @@ def download_deck(deck_id):
         # Get the cards
         cards = deck.get_cards()
         
-        # Create HTML for the PDF
-        html_content = render_template(
-            'pdf_template.html',
-            title=deck.title,
-            created=deck.created_at.isoformat(),
-            cards=cards
-        )
+        # The key changes whenever the deck's content does, so edits invalidate it
+        cache_key = make_key('deck_pdf', deck.id, deck.title, deck.created_at.isoformat(), cards)
+        filename = _pdf_filename(deck.title)
         
-        # Generate PDF and force content-type
-        pdf = HTML(string=html_content).write_pdf()
+        pdf_path = get_cached_pdf(cache_key)
+        if pdf_path:
+            return _send_pdf(pdf_path, filename)
         
-        # Create a response with the right headers
-        filename = f"{deck.title.replace(' ', '_')}.pdf"
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        # A render already under way only needs its job id, not the deck's HTML
+        job_id = None
+        if deck.card_count >= PDF_BACKGROUND_MIN_CARDS:
+            job_id = _pending_pdf_job(cache_key)
+        
+        if job_id is None:
+            # The job may have finished since the cache was checked
+            pdf_path = get_cached_pdf(cache_key)
+            if pdf_path:
+                return _send_pdf(pdf_path, filename)
+            
+            # Create HTML for the PDF
+            html_content = render_template(
+                'pdf_template.html',
+                title=deck.title,
+                created=deck.created_at.isoformat(),
+                cards=cards
+            )
+        
+        # Large decks take seconds to render, so do it in the background
+        if deck.card_count >= PDF_BACKGROUND_MIN_CARDS:
+            if job_id is None:
+                job_id = submit_job('render_pdf', _render_pdf_job, cache_key, html_content, request.host_url, deck.id)
+                _remember_pdf_job(cache_key, job_id)
+            
+            if request.accept_mimetypes.best == 'application/json':
+                return _job_response(job_id)
+            
+            flash('This deck is large, so its PDF is being prepared. Click Download again in a moment.')
+            return redirect(url_for('my_decks'))
+        
+        pdf_path = render_pdf_file(cache_key, lambda target: _write_pdf(html_content, target))
+        return _send_pdf(pdf_path, filename)
     except Exception as e:
         print(f"Error downloading deck: {str(e)}")
         flash(f"Error downloading deck: {str(e)}")
@@ -341,33 +672,84 @@ def download_deck_direct():
             
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-            
-        # Create HTML for the PDF
-        html_content = render_template(
-            'pdf_template.html',
-            title=data.get('title', 'Flashcards'),
-            created=datetime.utcnow().isoformat(),
-            cards=data.get('cards', {})
-        )
         
-        # Generate PDF and force content-type
-        pdf = HTML(string=html_content).write_pdf()
+        title = data.get('title', 'Flashcards')
+        cards = data.get('cards', {})
         
-        # Create a response with the right headers
-        filename = f"{data.get('title', 'flashcards').replace(' ', '_')}.pdf"
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        # Identical posted decks render to the same PDF
+        cache_key = make_key('direct_pdf', title, cards)
+        filename = _pdf_filename(data.get('title', 'flashcards'))
+        
+        pdf_path = get_cached_pdf(cache_key)
+        if not pdf_path:
+            # Create HTML for the PDF
+            html_content = render_template(
+                'pdf_template.html',
+                title=title,
+                created=datetime.utcnow().isoformat(),
+                cards=cards
+            )
+            
+            pdf_path = render_pdf_file(cache_key, lambda target: _write_pdf(html_content, target))
+        
+        return _send_pdf(pdf_path, filename)
     except Exception as e:
         print(f"Error downloading deck: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/export_deck/<int:deck_id>/<fmt>')
+@login_required
+def export_deck(deck_id, fmt):
+    """Stream a deck as CSV, TSV, JSONL or an Anki import file"""
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown export format: {fmt}"}), 404
+    
+    deck = Deck.query.get_or_404(deck_id)
+    
+    # Ensure user owns this deck
+    if deck.user_id != current_user.id:
+        flash('You do not have permission to export this deck')
+        return redirect(url_for('my_decks'))
+    
+    exporter, mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"{deck.title.replace(' ', '_')}.{extension}"
+    
+    # Cards are read from the database in batches while the response is sent
+    response = Response(stream_with_context(exporter(deck.title, deck.iter_cards())), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+DECKS_PER_PAGE = 20
+
 @app.route('/my_decks')
 @login_required
 def my_decks():
-    decks = Deck.query.filter_by(user_id=current_user.id).order_by(Deck.created_at.desc()).all()
-    return render_template('my_decks.html', decks=decks)
+    # Only load the columns the listing shows, never the cards themselves
+    query = (Deck.query
+             .options(db.load_only(Deck.id, Deck.title, Deck.created_at, Deck.last_studied, Deck.card_count))
+             .filter_by(user_id=current_user.id))
+    
+    # Keyset pagination: continue after the last deck of the previous page
+    before = request.args.get('before')
+    before_id = request.args.get('before_id', type=int)
+    if before and before_id:
+        try:
+            before = datetime.fromisoformat(before)
+        except ValueError:
+            return redirect(url_for('my_decks'))
+        query = query.filter(db.or_(
+            Deck.created_at < before,
+            db.and_(Deck.created_at == before, Deck.id < before_id)
+        ))
+    
+    decks = query.order_by(Deck.created_at.desc(), Deck.id.desc()).limit(DECKS_PER_PAGE + 1).all()
+    
+    next_page = None
+    if len(decks) > DECKS_PER_PAGE:
+        decks = decks[:DECKS_PER_PAGE]
+        next_page = url_for('my_decks', before=decks[-1].created_at.isoformat(), before_id=decks[-1].id)
+    
+    return render_template('my_decks.html', decks=decks, next_page=next_page, is_first_page=not before_id)
 
 @app.route('/load_deck/<int:deck_id>')
 @login_required
@@ -385,6 +767,147 @@ def load_deck(deck_id):
     
     return render_template('flashcards.html', deck=deck)
 
+@app.route('/decks/<int:deck_id>/cards')
+@login_required
+def deck_cards(deck_id):
+    """Page through a deck's cards without loading the whole deck"""
+    deck = Deck.query.get_or_404(deck_id)
+    
+    # Ensure user owns this deck
+    if deck.user_id != current_user.id:
+        return jsonify({'error': 'You do not have permission to access this deck'}), 403
+    
+    section = request.args.get('section', 'main')
+    after = request.args.get('after', -1, type=int)
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    
+    cards = (Card.query
+             .filter(Card.deck_id == deck.id, Card.section == section, Card.position > after)
+             .order_by(Card.position)
+             .limit(limit)
+             .all())
+    
+    return jsonify({
+        'cards': [dict(card.to_dict(), id=card.id, position=card.position) for card in cards],
+        'next_after': cards[-1].position if len(cards) == limit else None
+    })
+
+@app.route('/cards/<int:card_id>', methods=['POST'])
+@login_required
+def update_card(card_id):
+    """Edit a single card in place"""
+    card = Card.query.get_or_404(card_id)
+    
+    # Ensure user owns the deck this card belongs to
+    if card.deck.user_id != current_user.id:
+        return jsonify({'error': 'You do not have permission to edit this card'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    for field in ('question', 'answer'):
+        if field in data and not isinstance(data[field], str):
+            return jsonify({'error': f"{field} must be a string"}), 400
+    
+    if 'question' in data:
+        card.question = data['question']
+    if 'answer' in data:
+        card.answer = data['answer']
+    db.session.commit()
+    
+    return jsonify({'success': True, 'card': dict(card.to_dict(), id=card.id)})
+
+REVIEW_BATCH_MAX = 100
+REVIEW_NEW_CARDS = int(os.environ.get('FLASHCARD_REVIEW_NEW_CARDS', 20))
+
+def _review_card_dict(card):
+    return dict(
+        card.to_dict(),
+        id=card.id,
+        deck_id=card.deck_id,
+        section=card.section,
+        due_at=card.due_at.isoformat() if card.due_at else None,
+        new=card.due_at is None
+    )
+
+@app.route('/review/next')
+@login_required
+def review_next():
+    """Get the next batch of cards due for review across all of the user's decks"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), REVIEW_BATCH_MAX))
+    deck_id = request.args.get('deck_id', type=int)
+    now = datetime.utcnow()
+    
+    # Only the columns needed to show a card, read straight off the (user_id, due_at) index
+    base = (Card.query
+            .options(db.load_only(Card.id, Card.deck_id, Card.section, Card.question, Card.answer, Card.due_at))
+            .filter(Card.user_id == current_user.id))
+    if deck_id is not None:
+        base = base.filter(Card.deck_id == deck_id)
+    
+    # Overdue cards first, most overdue first
+    cards = (base
+             .filter(Card.due_at <= now)
+             .order_by(Card.due_at, Card.id)
+             .limit(limit)
+             .all())
+    
+    # Top up with cards that have never been reviewed
+    new_limit = min(limit - len(cards), REVIEW_NEW_CARDS)
+    if new_limit > 0:
+        cards += (base
+                  .filter(Card.due_at.is_(None))
+                  .order_by(Card.id)
+                  .limit(new_limit)
+                  .all())
+    
+    return jsonify({'cards': [_review_card_dict(card) for card in cards]})
+
+@app.route('/review', methods=['POST'])
+@login_required
+def review():
+    """
+    Record one or more reviews
+    
+    Expects JSON: {"card_id": ..., "grade": 0-5} or
+    {"reviews": [{"card_id": ..., "grade": ...}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    reviews = data.get('reviews', [data])
+    if not isinstance(reviews, list) or not reviews or len(reviews) > REVIEW_BATCH_MAX:
+        return jsonify({'error': f"Send between 1 and {REVIEW_BATCH_MAX} reviews"}), 400
+    
+    grades = {}
+    for item in reviews:
+        try:
+            grade = int(item['grade'])
+            card_id = int(item['card_id'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Each review needs a card_id and a grade'}), 400
+        if not MIN_GRADE <= grade <= MAX_GRADE:
+            return jsonify({'error': f"Grade must be between {MIN_GRADE} and {MAX_GRADE}"}), 400
+        grades[card_id] = grade
+    
+    # Load every reviewed card in one query; cards of other users are simply not found
+    cards = Card.query.filter(Card.id.in_(grades), Card.user_id == current_user.id).all()
+    if len(cards) != len(grades):
+        return jsonify({'error': 'Card not found'}), 404
+    
+    now = datetime.utcnow()
+    for card in cards:
+        review_card(card, grades[card.id], now)
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'cards': [
+            {'id': card.id, 'due_at': card.due_at.isoformat(), 'interval': card.interval, 'ease_factor': card.ease_factor}
+            for card in cards
+        ]
+    })
+
 @app.route('/delete_deck/<int:deck_id>', methods=['POST'])
 @login_required
 def delete_deck(deck_id):
@@ -0,0 +1,316 @@
+"""
+End-to-end benchmark of the app under gunicorn, against a local fake OpenAI API
+
+Usage:
+    python benchmarks/bench_app.py [--configs 1x1,2x2,4x2] [--requests 40] [--concurrency 8]
+                                   [--latency 0.5] [--sizes 16,128,512] [--scenarios text,topic,files,pdf]
+                                   [--json results.json]
+
+For each worker configuration (workers x threads) gunicorn is started with
+OPENAI_BASE_URL pointing at benchmarks/fake_openai.py, and each scenario is
+driven by concurrent clients:
+
+    text          POST /generate with a few KB of text
+    topic         POST /generate_from_topic (web search turned off)
+    files_<kind>  POST /generate_from_files with TXT, DOCX and PDF fixtures of each size
+    pdf           POST /download_deck_direct, rendering a deck to PDF
+
+The app's caches and single-flight coalescing are turned off, so every
+request does the full work even when its input matches another's.
+
+Prints throughput, p50/p95/p99 latency and the peak RSS of the gunicorn
+workers (VmHWM from /proc, the high-water mark since the workers started,
+so it only grows across scenarios).
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import resource
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openai import start_server
+from fixtures import build_fixtures, make_paragraphs
+
+READY_TIMEOUT = 60
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def worker_pids(master_pid):
+    """Pids of the gunicorn workers forked by the master"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The parent pid is the second field after the parenthesised command name
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == master_pid:
+            pids.append(int(entry))
+    return pids
+
+def peak_rss_kb(pids):
+    """VmHWM (peak resident set size) of each process, in KB"""
+    peaks = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        peaks[pid] = int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return peaks
+
+class AppServer:
+    """
+    The app running under gunicorn with a given worker configuration
+
+    Args:
+        workers (int): Gunicorn worker processes
+        threads (int): Threads per worker
+        env (dict): Extra environment variables for the app
+        workdir (str): Scratch directory for the database, job store and caches
+    """
+
+    def __init__(self, workers, threads, env, workdir):
+        self.workers = workers
+        self.threads = threads
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = dict(os.environ)
+        self.env.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            'FLASHCARD_JOBS_PATH': os.path.join(workdir, 'jobs.db'),
+            'FLASHCARD_PDF_CACHE_DIR': os.path.join(workdir, 'pdfs'),
+            'FLASHCARD_METRICS_DIR': os.path.join(workdir, 'metrics'),
+            'FLASHCARD_CACHE_BACKEND': 'none',
+            'FLASHCARD_SINGLEFLIGHT': 'false',
+            'FLASHCARD_SEARCH_BACKEND': 'none',
+            'FLASHCARD_REQUEST_LOG': 'false',
+        })
+        # Keep the client-side rate limiter out of the way unless the caller set it
+        self.env.setdefault('FLASHCARD_LLM_RPM', '1000000')
+        self.env.setdefault('FLASHCARD_LLM_TPM', '1000000000')
+        self.env.update(env)
+        self.log = open(os.path.join(workdir, f"gunicorn_{workers}x{threads}.log"), 'w')
+        self.process = None
+
+    def __enter__(self):
+        command = [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '--workers', str(self.workers), '--threads', str(self.threads),
+            '--bind', f"127.0.0.1:{self.port}", 'app:app'
+        ]
+        self.process = subprocess.Popen(command, cwd=ROOT, env=self.env, stdout=self.log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {self.process.returncode}, see {self.log.name}")
+            try:
+                if requests.get(f"{self.url}/metrics", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"gunicorn did not start within {READY_TIMEOUT}s, see {self.log.name}")
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+    def peak_memory(self):
+        """Peak RSS in MB as (largest worker, all workers), or None where /proc isn't available"""
+        if not os.path.isdir('/proc'):
+            return None
+        peaks = peak_rss_kb(worker_pids(self.process.pid))
+        if not peaks:
+            return None
+        return max(peaks.values()) / 1024, sum(peaks.values()) / 1024
+
+def text_scenario(size):
+    paragraphs = make_paragraphs(size, seed=7)
+
+    def request(i):
+        text = '\n\n'.join(paragraphs + [f"This is benchmark request number {i}."])
+        return 'POST', '/generate', {'data': {'text_input': text, 'format': 'plain'}}
+    return request
+
+def topic_scenario():
+    def request(i):
+        return 'POST', '/generate_from_topic', {'data': {'topic_input': f"Cell biology part {i}"}}
+    return request
+
+def file_scenario(path):
+    with open(path, 'rb') as f:
+        content = f.read()
+    filename = os.path.basename(path)
+
+    def request(i):
+        return 'POST', '/generate_from_files', {'files': {'files': (filename, content)}}
+    return request
+
+def pdf_scenario(cards):
+    deck = {'main': [
+        {'question': f"What is fact {n} about the cell?", 'answer': f"Fact {n} is a detail about how the cell works."}
+        for n in range(cards)
+    ]}
+
+    def request(i):
+        # A new title each time so the rendered PDF cache isn't hit
+        return 'POST', '/download_deck_direct', {'json': {'title': f"Benchmark deck {i}", 'cards': deck}}
+    return request
+
+def run_scenario(base_url, make_request, total, concurrency, warmup):
+    """
+    Send requests from concurrent clients and time them
+
+    Returns:
+        dict: Counts, throughput and latency percentiles
+    """
+    local = threading.local()
+
+    def send(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, options = make_request(i)
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, timeout=300, **options)
+            ok = response.status_code == 200
+            if ok and response.headers.get('Content-Type', '').startswith('application/json'):
+                ok = 'error' not in response.json()
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    for i in range(warmup):
+        send(-1 - i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    return {
+        'requests': total,
+        'errors': sum(1 for ok, _ in results if not ok),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+def build_scenarios(args, fixture_dir):
+    wanted = set(args.scenarios.split(','))
+    scenarios = []
+    if 'text' in wanted:
+        scenarios.append(('text', text_scenario(args.text_kb * 1024)))
+    if 'topic' in wanted:
+        scenarios.append(('topic', topic_scenario()))
+    if 'files' in wanted:
+        sizes = [int(size) * 1024 for size in args.sizes.split(',')]
+        for kind, size, path in build_fixtures(fixture_dir, sizes):
+            scenarios.append((f"files_{kind}_{size // 1024}kb", file_scenario(path)))
+    if 'pdf' in wanted:
+        scenarios.append(('pdf', pdf_scenario(args.pdf_cards)))
+    return scenarios
+
+def print_row(config, name, result, memory):
+    peak = f"{memory[0]:8.1f} {memory[1]:9.1f}" if memory else f"{'n/a':>8} {'n/a':>9}"
+    print(f"{config:>7} {name:<20} {result['requests'] - result['errors']:>4}/{result['requests']:<4} "
+          f"{result['throughput']:>8.2f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {peak}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default='1x1,2x2,4x2', help='worker configurations as WORKERSxTHREADS')
+    parser.add_argument('--requests', type=int, default=40, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed requests before each scenario')
+    parser.add_argument('--latency', type=float, default=0.5, help='fake API seconds per response')
+    parser.add_argument('--jitter', type=float, default=0.1, help='fake API random extra seconds')
+    parser.add_argument('--cards', type=int, default=8, help='cards per fake API response')
+    parser.add_argument('--text-kb', type=int, default=8, help='size of the text scenario input')
+    parser.add_argument('--sizes', default='16,128,512', help='file fixture sizes in KB')
+    parser.add_argument('--pdf-cards', type=int, default=100, help='cards in the exported deck')
+    parser.add_argument('--scenarios', default='text,topic,files,pdf')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    fake = start_server(latency=args.latency, jitter=args.jitter, cards=args.cards)
+    fixture_dir = os.path.join(tempfile.gettempdir(), 'flashcard_bench_fixtures')
+    scenarios = build_scenarios(args, fixture_dir)
+    env = {'OPENAI_BASE_URL': fake.base_url, 'OPENAI_API_KEY': 'benchmark'}
+
+    print(f"Fake API latency {args.latency}s (+{args.jitter}s), {args.requests} requests per scenario, "
+          f"{args.concurrency} clients")
+    print(f"{'config':>7} {'scenario':<20} {'ok':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'peak MB':>8} {'total MB':>9}")
+
+    results = []
+    for config in args.configs.split(','):
+        workers, threads = (int(part) for part in config.lower().split('x'))
+        workdir = tempfile.mkdtemp(prefix=f"flashcard_bench_{config}_")
+        with AppServer(workers, threads, env, workdir) as server:
+            for name, make_request in scenarios:
+                result = run_scenario(server.url, make_request, args.requests, args.concurrency, args.warmup)
+                memory = server.peak_memory()
+                print_row(config, name, result, memory)
+                result.update(config=config, scenario=name)
+                if memory:
+                    result.update(peak_worker_mb=round(memory[0], 1), peak_total_mb=round(memory[1], 1))
+                results.append(result)
+        # Only kept (with the gunicorn log) when the run fails
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if not os.path.isdir('/proc'):
+        # Without /proc, the best available figure is the largest process reaped so far
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        print(f"Peak RSS of any worker across all runs: {maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024):.1f} MB")
+
+    print(f"Fake API served {fake.requests} calls")
+    fake.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for text normalisation throughput
+
+Usage:
+    python benchmarks/bench_text_processor.py [--size-mb 8] [--repeat 5]
+
+Prints the best-of-N throughput in MB/s of process_text for each input
+format, and of iter_paragraphs fed in 64 KB pieces as file ingestion does.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flashcard_ai.text_processor import process_text, iter_paragraphs
+
+WORDS = ('cell', 'membrane', 'protein', 'energy', 'mitochondria', 'the', 'of', 'and',
+         'transport', 'nucleus', 'division', 'structure', 'function', 'organism', 'is')
+
+def make_paragraph(rng):
+    sentences = []
+    for _ in range(rng.randint(2, 6)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+        sentences.append(' '.join(words).capitalize() + '.')
+    return '  '.join(sentences)
+
+def make_input(format_type, size, seed=1):
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        paragraph = make_paragraph(rng)
+        if format_type == 'markdown':
+            if rng.random() < 0.1:
+                paragraph = f"## {rng.choice(WORDS).title()} section\n\n" + paragraph
+            paragraph = paragraph.replace(' energy ', ' **energy** ').replace(' cell ', ' *cell* ')
+        elif format_type == 'html':
+            paragraph = f"<p class=\"body\">{paragraph.replace(' of ', ' of&nbsp;')}</p>"
+        # Hard-wrapped lines and ragged whitespace, like pasted or extracted text
+        paragraph = '\n'.join(paragraph[i:i + 72] for i in range(0, len(paragraph), 72))
+        parts.append(paragraph)
+        total += len(paragraph) + 2
+    return '\n\n'.join(parts)
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    print(f"{'benchmark':<28} {'MB/s':>8}")
+
+    for format_type in ('plain', 'markdown', 'html'):
+        text = make_input(format_type, size)
+        megabytes = len(text.encode()) / (1024 * 1024)
+        elapsed = best_time(lambda: process_text(text, format_type), args.repeat)
+        print(f"{'process_text ' + format_type:<28} {megabytes / elapsed:>8.1f}")
+
+    text = make_input('plain', size)
+    megabytes = len(text.encode()) / (1024 * 1024)
+    pieces = [text[i:i + 65536] for i in range(0, len(text), 65536)]
+    elapsed = best_time(lambda: sum(1 for _ in iter_paragraphs(pieces)), args.repeat)
+    print(f"{'iter_paragraphs streamed':<28} {megabytes / elapsed:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Cold-start check: how long a fresh worker takes to load the app and answer
+
+Usage:
+    python benchmarks/cold_start.py [--runs 5] [--budget 1.0]
+
+Each run starts a new interpreter, imports app (as a gunicorn worker does
+without preload) and serves one request through the test client. Prints
+the median import time, time to first response and peak RSS, and lists
+any heavy optional subsystem that was loaded at import time although it
+should only load on first use.
+
+Exits with status 1 when the median time to first response is over the
+budget (FLASHCARD_COLD_START_BUDGET, in seconds) or a heavy module was
+imported eagerly. tests/test_cold_start.py runs the same check.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START_BUDGET = float(os.environ.get('FLASHCARD_COLD_START_BUDGET', 1.0))
+
+# Subsystems most requests never need; they must load on first use
+LAZY_MODULES = ('weasyprint', 'flask_weasyprint', 'openai', 'httpx', 'bs4', 'lxml', 'requests',
+                'pdfminer', 'docx', 'tiktoken', 'pytesseract', 'PIL')
+
+PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/metrics')
+answered = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'first_response': answered - start,
+    'status': response.status_code,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded': sorted({name.split('.')[0] for name in sys.modules} & set(LAZY_MODULES)),
+}))
+"""
+
+def probe(workdir):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'cold_start.db')}",
+        'FLASHCARD_METRICS_DIR': '',
+        'FLASHCARD_REQUEST_LOG': 'false',
+    })
+    code = f"LAZY_MODULES = {LAZY_MODULES!r}\n" + PROBE
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure(runs=5):
+    """
+    Start the app in fresh interpreters and summarise the runs
+
+    Args:
+        runs (int): Timed runs, after one untimed run that creates the database
+
+    Returns:
+        dict: Median import and first response times in seconds, peak RSS in
+              MB and the heavy modules any run loaded at import time
+    """
+    with tempfile.TemporaryDirectory(prefix='flashcard_cold_start_') as workdir:
+        # The first run creates the database; time the runs after it, like a worker restart
+        probe(workdir)
+        results = [probe(workdir) for _ in range(runs)]
+
+    return {
+        'import': statistics.median(result['import'] for result in results),
+        'first_response': statistics.median(result['first_response'] for result in results),
+        'maxrss_mb': max(result['maxrss_kb'] for result in results) / 1024,
+        'loaded': sorted({name for result in results for name in result['loaded']}),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=COLD_START_BUDGET, help='seconds to first response')
+    args = parser.parse_args()
+
+    summary = measure(args.runs)
+    first_response = summary['first_response']
+    loaded = summary['loaded']
+
+    print(f"import app         {summary['import'] * 1000:8.1f} ms (median of {args.runs})")
+    print(f"first response     {first_response * 1000:8.1f} ms (budget {args.budget * 1000:.0f} ms)")
+    print(f"peak RSS           {summary['maxrss_mb']:8.1f} MB")
+    print(f"eagerly loaded     {', '.join(loaded) or 'none'}")
+
+    failed = False
+    if first_response > args.budget:
+        print(f"FAIL: cold start is {first_response - args.budget:.3f}s over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: {', '.join(loaded)} should only be imported on first use")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Local stand-in for the OpenAI chat completions API
+
+Answers POST /v1/chat/completions with canned flashcard JSON after a
+configurable delay, so the app can be load-tested without API calls.
+Every response has different questions so de-duplication keeps the cards.
+
+Usage:
+    python benchmarks/fake_openai.py [--port 8099] [--latency 0.5] [--jitter 0.1] [--cards 8]
+
+Then start the app with OPENAI_BASE_URL=http://127.0.0.1:8099/v1 and any OPENAI_API_KEY.
+"""
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUBJECTS = ('mitochondria', 'the cell membrane', 'osmosis', 'photosynthesis', 'enzymes', 'ribosomes',
+            'the nucleus', 'diffusion', 'meiosis', 'ATP', 'chlorophyll', 'the cytoskeleton')
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    HTTP server that plays the chat completions API
+
+    Args:
+        address (tuple): (host, port) to listen on; port 0 picks a free port
+        latency (float): Seconds to wait before answering, like model generation time
+        jitter (float): Random extra delay of up to this many seconds
+        cards (int): Cards in each response
+        stream_delay (float): Seconds between chunks of a streamed response
+
+    Put HTTP status codes in `failures` to answer the next requests with
+    those errors instead (429s come with Retry-After: 0), e.g. for tests.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, jitter=0.0, cards=8, stream_delay=0.01):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.cards = cards
+        self.stream_delay = stream_delay
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_id(self):
+        with self.lock:
+            self.requests += 1
+            return next(self.counter)
+
+    def next_failure(self):
+        with self.lock:
+            return self.failures.pop(0) if self.failures else None
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+def canned_flashcards(response_id, cards):
+    """
+    Build the JSON body the model would write
+
+    Args:
+        response_id (int): Number of the response, used to make the questions unique
+        cards (int): Number of cards
+
+    Returns:
+        str: Flashcards JSON as the model's message content
+    """
+    main = []
+    for i in range(cards):
+        subject = SUBJECTS[(response_id + i) % len(SUBJECTS)]
+        main.append({
+            'question': f"What does fact {response_id}-{i} say about {subject}?",
+            'answer': f"Fact {response_id}-{i} describes how {subject} works in answer number {response_id * 1000 + i}."
+        })
+    return json.dumps({'main': main, 'definitions': [], 'cloze': []})
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON', 'type': 'invalid_request_error'}})
+            return
+
+        server = self.server
+        response_id = server.next_id()
+        server.enter()
+        try:
+            self._respond(server, response_id, request)
+        finally:
+            server.leave()
+
+    def _respond(self, server, response_id, request):
+        status = server.next_failure()
+        if status is not None:
+            headers = {'Retry-After': '0'} if status == 429 else None
+            self._send_json(status, {'error': {'message': f"Injected HTTP {status}", 'type': 'fake_error'}}, headers)
+            return
+
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        content = canned_flashcards(response_id, server.cards)
+        prompt_tokens = sum(len(message.get('content') or '') for message in request.get('messages', [])) // 4
+        completion_tokens = len(content) // 4
+        model = request.get('model', 'gpt-3.5-turbo')
+
+        if request.get('stream'):
+            self._stream(response_id, model, content)
+            return
+
+        self._send_json(200, {
+            'id': f"chatcmpl-fake-{response_id}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _stream(self, response_id, model, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                'id': f"chatcmpl-fake-{response_id}",
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        event({'role': 'assistant', 'content': ''})
+        for i in range(0, len(content), 40):
+            event({'content': content[i:i + 40]})
+            time.sleep(self.server.stream_delay)
+        event({}, 'stop')
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """
+    Start the fake API on a background thread
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port, 0 for any free port
+        **options: latency, jitter, cards and stream_delay for FakeOpenAIServer
+
+    Returns:
+        FakeOpenAIServer: The running server; call shutdown() to stop it
+    """
+    server = FakeOpenAIServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds per response')
+    parser.add_argument('--cards', type=int, default=8, help='cards per response')
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer((args.host, args.port), latency=args.latency, jitter=args.jitter, cards=args.cards)
+    print(f"Fake OpenAI API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Generated TXT, DOCX and PDF documents for the benchmarks
+
+Fixtures are made on the fly from a fixed seed so every run uploads the
+same bytes. PDFs are written directly (one Helvetica text stream per page),
+so no PDF library is needed.
+"""
+import os
+import random
+from io import BytesIO
+
+WORDS = ('cell', 'membrane', 'protein', 'energy', 'mitochondria', 'the', 'of', 'and', 'transport',
+         'nucleus', 'division', 'structure', 'function', 'organism', 'is', 'enzyme', 'reaction', 'a')
+
+LINE_LENGTH = 90
+LINES_PER_PAGE = 55
+
+def make_paragraphs(size, seed=1):
+    """
+    Make paragraphs of plausible text
+
+    Args:
+        size (int): Approximate total size in bytes
+        seed (int): Random seed
+
+    Returns:
+        list: Paragraphs
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < size:
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+            sentences.append(' '.join(words).capitalize() + '.')
+        paragraph = ' '.join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return paragraphs
+
+def make_txt(paragraphs):
+    return '\n\n'.join(paragraphs).encode('utf-8')
+
+def make_docx(paragraphs):
+    import docx
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def _wrap(paragraph):
+    lines = []
+    line = ''
+    for word in paragraph.split():
+        if line and len(line) + len(word) + 1 > LINE_LENGTH:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def make_pdf(paragraphs):
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(_wrap(paragraph))
+        lines.append('')
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        text = b' '.join(
+            b"(" + line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').encode('latin-1', 'replace') + b") '"
+            for line in page_lines
+        )
+        stream = b"BT /F1 10 Tf 12 TL 50 780 Td " + text + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents %d 0 R /Resources << /Font << /F1 3 0 R >> >> >>"
+            % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b' '.join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+BUILDERS = {'txt': make_txt, 'docx': make_docx, 'pdf': make_pdf}
+
+def build_fixtures(directory, sizes, kinds=('txt', 'docx', 'pdf')):
+    """
+    Write a fixture of each kind and size, reusing files from earlier runs
+
+    Args:
+        directory (str): Where to write the files
+        sizes (list): Text sizes in bytes
+        kinds (tuple): File types to make
+
+    Returns:
+        list: (kind, size, path) for every fixture
+    """
+    os.makedirs(directory, exist_ok=True)
+    fixtures = []
+    for size in sizes:
+        paragraphs = None
+        for kind in kinds:
+            path = os.path.join(directory, f"doc_{size // 1024}kb.{kind}")
+            if not os.path.exists(path):
+                paragraphs = paragraphs or make_paragraphs(size)
+                with open(path, 'wb') as f:
+                    f.write(BUILDERS[kind](paragraphs))
+            fixtures.append((kind, size, path))
+    return fixtures
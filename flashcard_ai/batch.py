@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from flashcard_ai.chunker import split_into_chunks, select_chunks, merge_flashcards
+from flashcard_ai.concurrency import MAX_IN_FLIGHT
+from flashcard_ai.flashcard_generator import generate_flashcards
+from flashcard_ai.metrics import propagate_context
+
+# Batch configuration (can be overridden from the environment)
+BATCH_MAX_DOCUMENTS = int(os.environ.get('FLASHCARD_BATCH_MAX_DOCUMENTS', 50))
+BATCH_MAX_CHUNKS = int(os.environ.get('FLASHCARD_BATCH_MAX_CHUNKS', 120))
+BATCH_RUN_TIMEOUT = float(os.environ.get('FLASHCARD_BATCH_RUN_TIMEOUT', 600))
+
+def plan_batch(texts, max_chunks=BATCH_MAX_CHUNKS):
+    """
+    Split every document into chunks and share the chunk budget between them
+
+    Each document gets an equal share of the batch's LLM calls; documents
+    that need fewer than their share hand the rest to the others.
+
+    Args:
+        texts (list): Processed text of each document
+        max_chunks (int): Maximum number of chunks (LLM calls) for the whole batch
+
+    Returns:
+        list: List of chunk lists, one per document
+    """
+    chunked = [split_into_chunks(text) or [text] for text in texts]
+    budgets = [0] * len(chunked)
+    remaining = max(max_chunks, len(chunked))
+
+    # Hand out the budget in rounds until every document is covered or it runs out
+    pending = list(range(len(chunked)))
+    while pending and remaining > 0:
+        share = max(1, remaining // len(pending))
+        still_pending = []
+        for i in pending:
+            if remaining <= 0:
+                break
+            grant = min(share, len(chunked[i]) - budgets[i], remaining)
+            budgets[i] += grant
+            remaining -= grant
+            if budgets[i] < len(chunked[i]):
+                still_pending.append(i)
+        pending = still_pending
+
+    return [select_chunks(chunks, max(1, budget)) for chunks, budget in zip(chunked, budgets)]
+
+def iter_batch(texts, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5", max_workers=MAX_IN_FLIGHT):
+    """
+    Generate flashcards for many documents, yielding each as soon as it is done
+
+    The chunks of all documents go through one shared pool, so the whole
+    batch never has more than max_workers LLM calls in flight, however many
+    documents it contains.
+
+    Args:
+        texts (list): Processed text of each document
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+        model (str): OpenAI model to use ('gpt-3.5-turbo', 'gpt-4')
+        max_workers (int): Maximum number of LLM calls in flight at once
+
+    Yields:
+        tuple: (document index, flashcards dictionary or None if generation failed)
+    """
+    plan = plan_batch(texts)
+    results = [[None] * len(chunks) for chunks in plan]
+    remaining = [len(chunks) for chunks in plan]
+    failed = [False] * len(plan)
+
+    def generate(chunk):
+        return generate_flashcards(
+            chunk,
+            difficulty=difficulty,
+            extract_definitions=extract_definitions,
+            create_cloze=create_cloze,
+            question_answer=question_answer,
+            model=model,
+            fallback=False
+        )
+
+    # Stage timings from the pool count towards the calling request
+    generate = propagate_context(generate)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='flashcard-batch')
+    try:
+        futures = {}
+        for doc_index, chunks in enumerate(plan):
+            for chunk_index, chunk in enumerate(chunks):
+                futures[executor.submit(generate, chunk)] = (doc_index, chunk_index)
+
+        done = set()
+        try:
+            for future in as_completed(futures, timeout=BATCH_RUN_TIMEOUT):
+                doc_index, chunk_index = futures[future]
+                try:
+                    results[doc_index][chunk_index] = future.result()
+                except Exception as e:
+                    print(f"Error generating batch document {doc_index}: {e}")
+                    failed[doc_index] = True
+
+                remaining[doc_index] -= 1
+                if remaining[doc_index] == 0:
+                    done.add(doc_index)
+                    yield doc_index, _merge(results[doc_index], failed[doc_index])
+        except TimeoutError:
+            print("Batch generation did not finish in time")
+
+        # Whatever finished of the documents that timed out is still worth returning
+        for doc_index in range(len(plan)):
+            if doc_index not in done:
+                yield doc_index, _merge(results[doc_index], True)
+    finally:
+        # Don't keep generating for a client that has gone away
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _merge(chunk_results, failed):
+    chunk_results = [result for result in chunk_results if result]
+    if not chunk_results:
+        return None
+    if failed:
+        print("Returning partial flashcards for a batch document")
+    return merge_flashcards(chunk_results)
+
+def generate_batch(texts, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5"):
+    """
+    Generate flashcards for many documents with shared concurrency
+
+    Args:
+        texts (list): Processed text of each document
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+        model (str): OpenAI model to use ('gpt-3.5-turbo', 'gpt-4')
+
+    Returns:
+        list: Flashcards dictionary (or None if generation failed) for each document, in input order
+    """
+    results = [None] * len(texts)
+    for doc_index, flashcards in iter_batch(
+        texts,
+        difficulty=difficulty,
+        extract_definitions=extract_definitions,
+        create_cloze=create_cloze,
+        question_answer=question_answer,
+        model=model
+    ):
+        results[doc_index] = flashcards
+    return results
@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Cache configuration (can be overridden from the environment)
+CACHE_BACKEND = os.environ.get('FLASHCARD_CACHE_BACKEND', 'tiered')  # 'memory', 'sqlite', 'tiered' or 'none'
+CACHE_PATH = os.environ.get('FLASHCARD_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'flashcard_cache.db'))
+CACHE_TTL = int(os.environ.get('FLASHCARD_CACHE_TTL', 7 * 24 * 3600))
+CACHE_MEMORY_ENTRIES = int(os.environ.get('FLASHCARD_CACHE_MEMORY_ENTRIES', 256))
+CACHE_MAX_BYTES = int(os.environ.get('FLASHCARD_CACHE_MAX_BYTES', 128 * 1024 * 1024))  # per namespace in the shared file, 0 for no limit
+CACHE_PURGE_INTERVAL = 60  # seconds between sweeps for expired entries
+
+def make_key(*parts):
+    """
+    Build a content-addressed cache key
+
+    Args:
+        *parts: JSON-serialisable values that identify the cached result
+
+    Returns:
+        str: SHA-256 hex digest of the parts
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class NullCache:
+    """Cache backend that never stores anything"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+class MemoryCache:
+    """
+    In-process LRU cache with a time-to-live
+
+    Values are stored as JSON so callers always get their own copy back
+    and can mutate it freely.
+    """
+
+    def __init__(self, max_entries=CACHE_MEMORY_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(payload)
+
+    def set(self, key, value, ttl=None):
+        payload = json.dumps(value)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SQLiteCache:
+    """
+    Disk-backed cache shared by every process that points at the same file
+
+    Each gunicorn worker opens its own connection, so all workers see the
+    same entries without any extra service to run.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, namespace='default', max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._last_purge = 0.0
+        # Caches can be created in the gunicorn master before it forks, and an open
+        # SQLite connection must not be shared with the workers, so don't keep this one
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0, "
+                    "accessed_at REAL NOT NULL DEFAULT 0, PRIMARY KEY (namespace, key))"
+                )
+                # Cache files created before size tracking existed need the new columns
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+                if 'size' not in columns:
+                    conn.execute("ALTER TABLE cache ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                if 'accessed_at' not in columns:
+                    conn.execute("ALTER TABLE cache ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_lru ON cache (namespace, accessed_at)")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # SQLite connections can't be shared between threads, keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self.delete(key)
+                return None
+            if self.max_bytes:
+                # Only size-bounded caches need recency for LRU eviction
+                with conn:
+                    conn.execute(
+                        "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        (time.time(), self.namespace, key)
+                    )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"Error reading from cache: {e}")
+            return None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, size, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, payload, expires_at, len(payload), now)
+                )
+                self._purge_expired(conn)
+                if self.max_bytes:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Error writing to cache: {e}")
+
+    def _purge_expired(self, conn):
+        """Drop expired entries, at most once per CACHE_PURGE_INTERVAL in each process"""
+        now = time.time()
+        if now - self._last_purge < CACHE_PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+
+    def _evict(self, conn):
+        """Drop least recently used entries until under max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT key, size FROM cache WHERE namespace = ? ORDER BY accessed_at",
+            (self.namespace,)
+        )
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((self.namespace, key))
+            total -= size
+        conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", stale)
+
+    def delete(self, key):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error as e:
+            print(f"Error deleting from cache: {e}")
+
+    def clear(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"Error clearing cache: {e}")
+
+class TieredCache:
+    """Fast in-process cache in front of a slower shared cache"""
+
+    def __init__(self, *tiers):
+        self.tiers = tiers
+
+    def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                # Promote the entry into the faster tiers
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def delete(self, key):
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(namespace='generation', backend=None, **options):
+    """
+    Get the shared cache for a namespace, creating it on first use
+
+    Args:
+        namespace (str): Name that keeps unrelated entries apart
+        backend (str): Backend override ('memory', 'sqlite', 'tiered', 'none')
+        **options: Extra settings for the shared SQLite tier (ttl, max_bytes),
+                   used when the cache is first created. Every namespace is
+                   bounded by CACHE_MAX_BYTES unless max_bytes is given.
+
+    Returns:
+        Cache object with get/set/delete/clear methods
+    """
+    backend = backend or CACHE_BACKEND
+    with _caches_lock:
+        cache = _caches.get((namespace, backend))
+        if cache is None:
+            try:
+                if backend == 'memory':
+                    cache = MemoryCache()
+                elif backend == 'sqlite':
+                    cache = SQLiteCache(namespace=namespace, **options)
+                elif backend == 'tiered':
+                    cache = TieredCache(MemoryCache(), SQLiteCache(namespace=namespace, **options))
+                else:
+                    cache = NullCache()
+            except sqlite3.Error as e:
+                print(f"Error opening shared cache, falling back to memory: {e}")
+                cache = MemoryCache()
+            _caches[(namespace, backend)] = cache
+        return cache
@@ -0,0 +1,146 @@
+import os
+import re
+import math
+from flashcard_ai.dedupe import NearDuplicateIndex
+
+# Chunking configuration (can be overridden from the environment)
+CHUNK_TOKENS = int(os.environ.get('FLASHCARD_CHUNK_TOKENS', 3000))
+MAX_CHUNKS = int(os.environ.get('FLASHCARD_MAX_CHUNKS', 24))
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+_HEADING = re.compile(r'^#{1,6} ')
+_NON_WORD = re.compile(r'\W+')
+
+def estimate_tokens(text):
+    """
+    Estimate how many model tokens a piece of text will use
+
+    Uses the usual ~4 characters per token rule, but never less than
+    ~1.3 tokens per word so short-word languages aren't underestimated.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 1.3))
+
+def _split_oversized(block, max_tokens):
+    """Split a single block that is over budget into sentences, then raw slices"""
+    pieces = []
+    for sentence in _SENTENCE_BREAK.split(block):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # No sentence boundary to use, cut on character count
+        step = max_tokens * 3
+        for start in range(0, len(sentence), step):
+            pieces.append(sentence[start:start + step])
+    return pieces
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    """
+    Split text into chunks that each fit within a token budget
+
+    Chunks break on paragraph and section boundaries where possible, and a
+    heading starts a new chunk once the current one is half full.
+
+    Args:
+        text (str): Text to split
+        max_tokens (int): Token budget for each chunk
+
+    Returns:
+        list: List of chunk strings, in document order
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for block in _PARAGRAPH_BREAK.split(text):
+        block = block.strip()
+        if not block:
+            continue
+
+        block_tokens = estimate_tokens(block)
+        pieces = [block] if block_tokens <= max_tokens else _split_oversized(block, max_tokens)
+
+        for piece in pieces:
+            # Count one extra token for the separator between pieces
+            piece_tokens = estimate_tokens(piece) + 1
+            starts_section = _HEADING.match(piece) and current_tokens > max_tokens // 2
+            if current and (current_tokens + piece_tokens > max_tokens or starts_section):
+                chunks.append('\n\n'.join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append('\n\n'.join(current))
+
+    return chunks
+
+def select_chunks(chunks, max_chunks=MAX_CHUNKS):
+    """
+    Limit the number of chunks while still covering the whole document
+
+    Args:
+        chunks (list): Chunks in document order
+        max_chunks (int): Maximum number of chunks to keep
+
+    Returns:
+        list: Evenly spaced chunks from start to end of the document
+    """
+    if len(chunks) <= max_chunks:
+        return chunks
+    step = len(chunks) / max_chunks
+    return [chunks[int(i * step)] for i in range(max_chunks)]
+
+def truncate_to_tokens(text, max_tokens=CHUNK_TOKENS):
+    """
+    Trim text to a token budget, cutting on a paragraph boundary
+
+    Args:
+        text (str): Text to trim
+        max_tokens (int): Token budget
+
+    Returns:
+        str: The leading part of the text that fits in the budget
+    """
+    chunks = split_into_chunks(text, max_tokens)
+    return chunks[0] if chunks else ''
+
+def normalize_question(question):
+    """Normalise a question for duplicate detection (case and punctuation insensitive)"""
+    return _NON_WORD.sub(' ', str(question).lower()).strip()
+
+def merge_flashcards(results):
+    """
+    Merge flashcard dictionaries from several chunks into one
+
+    Sections are concatenated in order and near-duplicate cards, within or
+    across sections, are only kept once.
+
+    Args:
+        results (list): Flashcard dictionaries, e.g. one per chunk
+
+    Returns:
+        dict: Dictionary containing different types of flashcards
+    """
+    merged = {}
+    index = NearDuplicateIndex()
+
+    for flashcards in results:
+        if not isinstance(flashcards, dict):
+            continue
+        for section, cards in flashcards.items():
+            section_cards = merged.setdefault(section, [])
+            if not isinstance(cards, list):
+                continue
+            for card in cards:
+                if isinstance(card, dict) and index.add(card):
+                    section_cards.append(card)
+
+    return merged
@@ -0,0 +1,132 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from flashcard_ai.metrics import propagate_context
+
+# Concurrency configuration (can be overridden from the environment)
+MAX_IN_FLIGHT = int(os.environ.get('FLASHCARD_MAX_IN_FLIGHT', 4))
+CALL_TIMEOUT = float(os.environ.get('FLASHCARD_CALL_TIMEOUT', 60))
+BATCH_TIMEOUT = float(os.environ.get('FLASHCARD_BATCH_TIMEOUT', 100))
+
+def run_concurrently(func, items, max_workers=MAX_IN_FLIGHT, timeout=BATCH_TIMEOUT, default=None):
+    """
+    Call a function on every item using a bounded pool of threads
+
+    Each call gets its own pool so nested use (e.g. a batch of documents
+    that are themselves chunked) can never deadlock waiting on itself.
+
+    Args:
+        func (callable): Function taking a single item
+        items (list): Items to process
+        max_workers (int): Maximum number of calls in flight at once
+        timeout (float): Seconds to wait for all calls before giving up
+        default: Result used for calls that fail or don't finish in time
+
+    Returns:
+        list: Results in the same order as the items
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    # Stage timings from the worker threads count towards the calling request
+    func = propagate_context(func)
+
+    # No point paying for a thread hop when there is only one call
+    if len(items) == 1 or max_workers <= 1:
+        results = []
+        for item in items:
+            try:
+                results.append(func(item))
+            except Exception as e:
+                print(f"Error in concurrent task: {e}")
+                results.append(default)
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix='flashcard')
+    try:
+        futures = [executor.submit(func, item) for item in items]
+        wait(futures, timeout=timeout)
+
+        results = []
+        for future in futures:
+            if not future.done():
+                print("Concurrent task did not finish in time")
+                results.append(default)
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error in concurrent task: {e}")
+                results.append(default)
+        return results
+    finally:
+        # Don't block the request on calls that have already timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def stream_concurrently(func, items, max_workers=MAX_IN_FLIGHT, timeout=BATCH_TIMEOUT):
+    """
+    Iterate a generator for every item using a bounded pool of threads
+
+    Values are yielded as soon as any generator produces them, so values
+    from different items are interleaved. Like run_concurrently, an item
+    whose generator fails is logged and skipped; the first error is only
+    raised if every item failed.
+
+    Args:
+        func (callable): Function taking a single item and returning an iterator
+        items (list): Items to process
+        max_workers (int): Maximum number of generators running at once
+        timeout (float): Seconds to wait for all generators before giving up
+
+    Yields:
+        Values from every generator, in the order they were produced
+    """
+    items = list(items)
+    if not items:
+        return
+
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def drain(item):
+        try:
+            for value in func(item):
+                # The consumer went away; closing the generator releases what it holds
+                if stop.is_set():
+                    break
+                results.put(('value', value))
+        except Exception as e:
+            results.put(('error', e))
+            return
+        results.put(('done', None))
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix='flashcard')
+    deadline = time.monotonic() + timeout
+    errors = []
+    try:
+        for item in items:
+            executor.submit(propagate_context(drain), item)
+
+        pending = len(items)
+        while pending:
+            try:
+                kind, value = results.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                print("Concurrent task did not finish in time")
+                break
+            if kind == 'value':
+                yield value
+                continue
+            pending -= 1
+            if kind == 'error':
+                print(f"Error in concurrent task: {value}")
+                errors.append(value)
+
+        if len(errors) == len(items):
+            raise errors[0]
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
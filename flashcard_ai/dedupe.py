@@ -0,0 +1,143 @@
+import os
+import re
+import zlib
+import random
+
+# Near-duplicate detection configuration (can be overridden from the environment)
+DEDUPE_THRESHOLD = float(os.environ.get('FLASHCARD_DEDUPE_THRESHOLD', 0.8))
+ANSWER_THRESHOLD = float(os.environ.get('FLASHCARD_DEDUPE_ANSWER_THRESHOLD', 0.5))
+
+SHINGLE_SIZE = 4
+NUM_BANDS = 8
+ROWS_PER_BAND = 5
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+
+_PRIME = (1 << 61) - 1
+_NON_WORD = re.compile(r'\W+')
+
+# Fixed seed, so signatures are the same in every worker process
+_rng = random.Random(20240601)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Split normalised text into overlapping character shingles
+
+    Case, punctuation and spacing are ignored, so "power-house" and
+    "powerhouse" produce the same shingles.
+
+    Args:
+        text (str): Text to split
+        size (int): Characters per shingle
+
+    Returns:
+        frozenset: Hashed shingles
+    """
+    text = _NON_WORD.sub('', str(text).lower())
+    if len(text) <= size:
+        return frozenset([zlib.crc32(text.encode())]) if text else frozenset()
+    return frozenset(zlib.crc32(text[i:i + size].encode()) for i in range(len(text) - size + 1))
+
+def jaccard(a, b):
+    """Jaccard similarity of two shingle sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def minhash(shingle_set):
+    """
+    Compute the MinHash signature of a shingle set
+
+    Args:
+        shingle_set (frozenset): Hashed shingles
+
+    Returns:
+        tuple: NUM_HASHES minimum hash values
+    """
+    if not shingle_set:
+        return (0,) * NUM_HASHES
+    return tuple(min((a * h + b) % _PRIME for h in shingle_set) for a, b in _HASH_PARAMS)
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing index of the cards seen so far
+
+    Each card's question signature is split into bands; cards sharing a band
+    are candidates and only those are compared, so checking n cards takes
+    roughly linear time instead of comparing every pair. A candidate is a
+    duplicate when the questions are at least `threshold` similar and the
+    answers also overlap, so "When did WW1 end?" and "When did WW2 end?"
+    are both kept.
+
+    Args:
+        threshold (float): Question similarity (0-1) at which cards are duplicates
+        answer_threshold (float): Answer similarity also required for non-identical questions
+    """
+
+    def __init__(self, threshold=DEDUPE_THRESHOLD, answer_threshold=ANSWER_THRESHOLD):
+        self.threshold = threshold
+        self.answer_threshold = answer_threshold
+        self.buckets = {}
+        self.cards = []
+
+    def _is_duplicate(self, question, answer, candidate):
+        other_question, other_answer = self.cards[candidate]
+        if question == other_question:
+            return True
+        return (jaccard(question, other_question) >= self.threshold
+                and jaccard(answer, other_answer) >= self.answer_threshold)
+
+    def add(self, card):
+        """
+        Add a card unless it is a near-duplicate of one already added
+
+        Args:
+            card (dict): Card with 'question' and 'answer'
+
+        Returns:
+            bool: True if the card was new and added, False if it is a duplicate
+        """
+        question = shingles(card.get('question', ''))
+        answer = shingles(card.get('answer', ''))
+        signature = minhash(question)
+        bands = [
+            (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+            for band in range(NUM_BANDS)
+        ]
+
+        checked = set()
+        for band in bands:
+            for candidate in self.buckets.get(band, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if self._is_duplicate(question, answer, candidate):
+                    return False
+
+        index = len(self.cards)
+        self.cards.append((question, answer))
+        for band in bands:
+            self.buckets.setdefault(band, []).append(index)
+        return True
+
+def dedupe_flashcards(flashcards, threshold=DEDUPE_THRESHOLD):
+    """
+    Remove near-duplicate cards across all sections of a deck
+
+    The first occurrence is kept, so earlier sections and chunks win.
+
+    Args:
+        flashcards (dict): Dictionary of cards grouped by section
+        threshold (float): Question similarity (0-1) at which cards are duplicates
+
+    Returns:
+        dict: The same sections with near-duplicate cards removed
+    """
+    index = NearDuplicateIndex(threshold)
+    result = {}
+    for section, cards in flashcards.items():
+        if not isinstance(cards, list):
+            result[section] = cards
+            continue
+        result[section] = [card for card in cards if isinstance(card, dict) and index.add(card)]
+    return result
@@ -0,0 +1,124 @@
+import io
+import html
+import csv
+import json
+
+# Card rows are written out in batches of this many lines per chunk of the response
+EXPORT_BATCH_LINES = 200
+
+def _batched(lines, size=EXPORT_BATCH_LINES):
+    # Join small lines into larger chunks so the response isn't one write per card
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+def _delimited_lines(cards, delimiter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator='\n')
+
+    def line(row):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    yield line(['section', 'question', 'answer'])
+    for section, question, answer in cards:
+        yield line([section, question, answer])
+
+def export_csv(title, cards):
+    """
+    Stream cards as CSV
+
+    Args:
+        title (str): Deck title (unused, kept for a uniform exporter signature)
+        cards: Iterable of (section, question, answer) tuples
+
+    Yields:
+        str: Chunks of the CSV file
+    """
+    return _batched(_delimited_lines(cards, ','))
+
+def export_tsv(title, cards):
+    """
+    Stream cards as tab-separated values
+
+    Args:
+        title (str): Deck title (unused, kept for a uniform exporter signature)
+        cards: Iterable of (section, question, answer) tuples
+
+    Yields:
+        str: Chunks of the TSV file
+    """
+    return _batched(_delimited_lines(cards, '\t'))
+
+def export_jsonl(title, cards):
+    """
+    Stream cards as JSON Lines, one card object per line
+
+    Args:
+        title (str): Deck title, included on every line
+        cards: Iterable of (section, question, answer) tuples
+
+    Yields:
+        str: Chunks of the JSONL file
+    """
+    lines = (
+        json.dumps({'deck': title, 'section': section, 'question': question, 'answer': answer}) + '\n'
+        for section, question, answer in cards
+    )
+    return _batched(lines)
+
+def _anki_field(value):
+    # Anki's importer treats the file as HTML, so keep line breaks visible
+    value = html.escape(value, quote=False)
+    return value.replace('\t', ' ').replace('\r\n', '\n').replace('\n', '<br>')
+
+def _anki_tag(value):
+    return '_'.join(value.split()) or 'main'
+
+def export_anki(title, cards):
+    """
+    Stream cards in Anki's text import format
+
+    The header lines tell Anki (2.1.55+) the separator, note type, target
+    deck and which column holds the tags, so the file imports without any
+    manual field mapping. The card's section becomes its tag.
+
+    Args:
+        title (str): Deck title, used as the Anki deck name
+        cards: Iterable of (section, question, answer) tuples
+
+    Yields:
+        str: Chunks of the import file
+    """
+    header = [
+        '#separator:tab\n',
+        '#html:true\n',
+        '#notetype:Basic\n',
+        f"#deck:{_anki_field(title)}\n",
+        '#tags column:3\n',
+    ]
+    lines = (
+        f"{_anki_field(question)}\t{_anki_field(answer)}\t{_anki_tag(section)}\n"
+        for section, question, answer in cards
+    )
+
+    def generate():
+        yield ''.join(header)
+        yield from _batched(lines)
+
+    return generate()
+
+# Exporters by format name: (function, mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv', 'csv'),
+    'tsv': (export_tsv, 'text/tab-separated-values', 'tsv'),
+    'jsonl': (export_jsonl, 'application/x-ndjson', 'jsonl'),
+    'anki': (export_anki, 'text/plain', 'txt'),
+}
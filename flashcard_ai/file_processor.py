@@ -1,10 +1,102 @@
 import os
+import shutil
+import hashlib
 import tempfile
+import threading
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
-from flashcard_ai.text_processor import process_text
-from flashcard_ai.flashcard_generator import generate_flashcards
+from flashcard_ai.text_processor import iter_paragraphs
+from flashcard_ai.flashcard_generator import generate_chunked_flashcards
+from flashcard_ai.chunker import split_into_chunks
+from flashcard_ai.concurrency import run_concurrently
+from flashcard_ai.pdf_extract import iter_pdf_pages
+from flashcard_ai.cache import get_cache, make_key
+from flashcard_ai.metrics import timer
 import io
 
+# Ingestion configuration (can be overridden from the environment)
+INGEST_MAX_CHARS = int(os.environ.get('FLASHCARD_INGEST_MAX_CHARS', 2000000))  # per request, across all files
+SPOOL_MAX_SIZE = int(os.environ.get('FLASHCARD_SPOOL_MAX_SIZE', 1024 * 1024))  # bytes kept in memory before spilling to disk
+TEXT_READ_SIZE = 64 * 1024
+TEXT_CACHE_MAX_BYTES = int(os.environ.get('FLASHCARD_TEXT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+TEXT_CACHE_TTL = int(os.environ.get('FLASHCARD_TEXT_CACHE_TTL', 30 * 24 * 3600))
+
+class TextBudget:
+    """
+    Limit on the amount of extracted text held in memory for one request
+    
+    Shared by all files in the request, so concurrent extraction of several
+    uploads can't add up to more than the budget.
+    """
+    
+    def __init__(self, max_chars=INGEST_MAX_CHARS):
+        self.remaining = max_chars
+        self.truncated = False
+        self._lock = threading.Lock()
+    
+    def take(self, size):
+        """
+        Reserve space for a piece of text
+        
+        Args:
+            size (int): Number of characters wanted
+        
+        Returns:
+            int: Number of characters that may be kept (0 once the budget is spent)
+        """
+        with self._lock:
+            allowed = max(0, min(size, self.remaining))
+            self.remaining -= allowed
+            if allowed < size:
+                self.truncated = True
+            return allowed
+
+def file_type(filename):
+    """Metric label for a file's type, limited to the types we know about"""
+    ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    return ext if ext in ('txt', 'pdf', 'docx', 'doc', 'png', 'jpg', 'jpeg') else 'other'
+
+def spool_upload(file):
+    """
+    Copy an upload into a spooled buffer that outlives the request
+    
+    Small files stay in memory, larger ones spill over to a temporary file,
+    so a background job can read the upload without holding it all in RAM.
+    
+    Args:
+        file: File object from request
+    
+    Returns:
+        FileStorage: Copy of the upload backed by a SpooledTemporaryFile
+    """
+    with timer('upload_save'):
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        shutil.copyfileobj(file.stream, spooled)
+        spooled.seek(0)
+    return FileStorage(stream=spooled, filename=file.filename)
+
+def collect_text(pieces, budget=None):
+    """
+    Join streamed pieces of text, stopping once the memory budget is spent
+    
+    Args:
+        pieces: Iterable of text pieces, e.g. from _iter_extracted_text
+        budget (TextBudget): Budget to charge, or None for no limit
+    
+    Returns:
+        str: Joined text
+    """
+    parts = []
+    for piece in pieces:
+        if budget is not None:
+            allowed = budget.take(len(piece))
+            if allowed < len(piece):
+                parts.append(piece[:allowed])
+                print("Extracted text exceeded the memory budget, truncating")
+                break
+        parts.append(piece)
+    return ''.join(parts)
+
 def process_files(files, difficulty='easy', extract_all=True, use_ocr=False, model='gpt-3.5'):
     """
     Process uploaded files and generate flashcards
@@ -14,63 +106,52 @@ def process_files(files, difficulty='easy', extract_all=True, use_ocr=False, mod
         difficulty (str): Difficulty level ('easy', 'medium', 'hard')
         extract_all (bool): Whether to extract all content
         use_ocr (bool): Whether to use OCR for images
-        
+    
     Returns:
         dict: Dictionary containing flashcards
     """
-    extracted_text = ""
+    chunks = []
     processed_files = []
+    budget = TextBudget()
     
-    # Process each file
-    for file in files:
-        if file.filename == '':
-            continue
-            
+    uploads = [file for file in files if file.filename != '']
+    
+    def extract(file):
         filename = secure_filename(file.filename)
-        
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(delete=False) as temp:
-            file.save(temp.name)
-            temp_path = temp.name
-        
         try:
-            # Extract text based on file type
-            file_text = extract_text_from_file(temp_path, filename, use_ocr)
-            if file_text:
-                extracted_text += f"\n\n--- From {filename} ---\n\n"
-                extracted_text += file_text
-                processed_files.append(filename)
-            
-            # Remove temporary file
-            os.unlink(temp_path)
-        
+            # Read straight from the upload stream, no temporary file round trip
+            text = extract_text_from_file(file.stream, filename, use_ocr, budget)
+            return ''.join(paragraph + '\n\n' for paragraph in iter_paragraphs(text))
         except Exception as e:
             print(f"Error processing file {filename}: {e}")
-            try:
-                os.unlink(temp_path)  # Clean up temp file in case of error
-            except:
-                pass
+            return None
+    
+    # Extract all files in parallel, keeping upload order
+    file_texts = run_concurrently(extract, uploads)
     
-    if not extracted_text:
+    for file, file_text in zip(uploads, file_texts):
+        if file_text:
+            # Chunk each file on its own so no request mixes two documents
+            chunks.extend(split_into_chunks(file_text))
+            processed_files.append(secure_filename(file.filename))
+    
+    if not chunks:
         return {
             "main": [
-                {"question": "No content could be extracted from the uploaded files.", 
+                {"question": "No content could be extracted from the uploaded files.",
                  "answer": "Try a different file format or check if the file contains extractable text."}
             ]
         }
     
-    # Process the extracted text
-    processed_text = process_text(extracted_text)
-    
-    # Generate flashcards
-    flashcards = generate_flashcards(
-        processed_text, 
+    # Generate flashcards for every chunk of every file
+    flashcards = generate_chunked_flashcards(
+        chunks,
         difficulty=difficulty,
         extract_definitions=extract_all,
         create_cloze=extract_all,
         question_answer=True,
         model=model  # Pass model parameter
-
+    
     )
     
     # Add a special card mentioning the source files
@@ -83,67 +164,66 @@ def process_files(files, difficulty='easy', extract_all=True, use_ocr=False, mod
     
     return flashcards
 
-def extract_text_from_file(file_path, filename, use_ocr=False):
-    """
-    Extract text from a file based on its type
-    
-    Args:
-        file_path (str): Path to the temporary file
-        filename (str): Original filename with extension
-        use_ocr (bool): Whether to use OCR for images
-        
-    Returns:
-        str: Extracted text
-    """
+def _content_hash(stream):
+    # Hash the upload in blocks so large files are never read into memory at once
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(TEXT_READ_SIZE), b''):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def _iter_extracted_text(stream, filename, use_ocr, errors):
+    """Extract text from a file by type, recording any failure in errors"""
     ext = os.path.splitext(filename)[1].lower()
     
     # Plain text file
     if ext in ['.txt', '.md', '.csv']:
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return f.read()
+            reader = io.TextIOWrapper(stream, encoding='utf-8', errors='ignore')
+            try:
+                while True:
+                    block = reader.read(TEXT_READ_SIZE)
+                    if not block:
+                        break
+                    yield block
+            finally:
+                # Don't let the wrapper close the underlying upload stream
+                reader.detach()
         except Exception as e:
+            errors.append(e)
             print(f"Error reading text file: {e}")
-            return f"Could not read {filename} due to an error: {str(e)}"
+            yield f"Could not read {filename} due to an error: {str(e)}"
     
     # PDF file
     elif ext == '.pdf':
         try:
-            from pdfminer.high_level import extract_text as pdf_extract_text
-            text = pdf_extract_text(file_path)
-            
-            # Clean up the text (remove excessive whitespace)
-            import re
-            text = re.sub(r'\s+', ' ', text).strip()
-            
-            # Break into paragraphs where appropriate
-            text = re.sub(r'(\. |\? |\! )(?=[A-Z])', r'\1\n\n', text)
-            
-            return text
-        except ImportError:
-            return "PDF extraction requires pdfminer.six package."
+            yield from iter_pdf_pages(stream)
+        except ImportError as e:
+            errors.append(e)
+            yield "PDF extraction requires pdfminer.six package."
         except Exception as e:
+            errors.append(e)
             print(f"Error extracting text from PDF: {e}")
-            return f"Could not extract text from {filename}: {str(e)}"
+            yield f"Could not extract text from {filename}: {str(e)}"
     
     # Word document
     elif ext in ['.docx', '.doc']:
         try:
             if ext == '.docx':
                 import docx
-                doc = docx.Document(file_path)
-                full_text = []
+                doc = docx.Document(stream)
                 for para in doc.paragraphs:
-                    full_text.append(para.text)
-                return '\n\n'.join(full_text)
+                    yield para.text + '\n\n'
             else:
                 # .doc files need additional processing
-                return "Legacy .doc format is not directly supported. Please convert to .docx."
-        except ImportError:
-            return "Word document extraction requires python-docx package."
+                yield "Legacy .doc format is not directly supported. Please convert to .docx."
+        except ImportError as e:
+            errors.append(e)
+            yield "Word document extraction requires python-docx package."
         except Exception as e:
+            errors.append(e)
             print(f"Error extracting text from Word document: {e}")
-            return f"Could not extract text from {filename}: {str(e)}"
+            yield f"Could not extract text from {filename}: {str(e)}"
     
     # Image file
     elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
@@ -152,16 +232,59 @@ def extract_text_from_file(file_path, filename, use_ocr=False):
                 import pytesseract
                 from PIL import Image
                 
-                img = Image.open(file_path)
-                return pytesseract.image_to_string(img)
-            except ImportError:
-                return "OCR requires pytesseract and Pillow packages."
+                img = Image.open(stream)
+                yield pytesseract.image_to_string(img)
+            except ImportError as e:
+                errors.append(e)
+                yield "OCR requires pytesseract and Pillow packages."
             except Exception as e:
+                errors.append(e)
                 print(f"Error performing OCR on image: {e}")
-                return f"Could not extract text from {filename}: {str(e)}"
+                yield f"Could not extract text from {filename}: {str(e)}"
         else:
-            return "Image files require OCR option to be enabled."
+            yield "Image files require OCR option to be enabled."
     
     # Unsupported file type
     else:
-        return f"Unsupported file type: {ext}. Supported formats: TXT, PDF, DOCX."
\ No newline at end of file
+        yield f"Unsupported file type: {ext}. Supported formats: TXT, PDF, DOCX."
+
+def extract_text_from_file(file_path, filename, use_ocr=False, budget=None):
+    """
+    Extract text from a file based on its type
+    
+    Results are cached by a SHA-256 of the file contents, so re-uploading
+    the same document skips extraction (and OCR) entirely. Text cut short
+    by the budget is returned but not cached.
+    
+    Args:
+        file_path: Path to the file, or a binary file object
+        filename (str): Original filename with extension
+        use_ocr (bool): Whether to use OCR for images
+        budget (TextBudget): Budget to charge, or None for no limit
+    
+    Returns:
+        str: Extracted text
+    """
+    with timer('extract_text', file_type=file_type(filename)):
+        if isinstance(file_path, (str, os.PathLike)):
+            with open(file_path, 'rb') as stream:
+                return _extract_text(stream, filename, use_ocr, budget)
+        return _extract_text(file_path, filename, use_ocr, budget)
+
+def _extract_text(stream, filename, use_ocr, budget):
+    """Extract text for extract_text_from_file, going through the extracted-text cache"""
+    ext = os.path.splitext(filename)[1].lower()
+    text_cache = get_cache('extracted_text', backend='sqlite', ttl=TEXT_CACHE_TTL, max_bytes=TEXT_CACHE_MAX_BYTES)
+    cache_key = make_key('extracted_text', _content_hash(stream), ext, use_ocr)
+    
+    cached = text_cache.get(cache_key)
+    if cached is not None:
+        return collect_text((cached,), budget)
+    
+    errors = []
+    text = collect_text(_iter_extracted_text(stream, filename, use_ocr, errors), budget)
+    
+    # Cache the text being returned, unless an error or the budget cut it short
+    if not errors and not (budget is not None and budget.truncated):
+        text_cache.set(cache_key, text)
+    return text
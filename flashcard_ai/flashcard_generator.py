@@ -1,15 +1,28 @@
-import os
-import json
-from dotenv import load_dotenv
-from openai import OpenAI
+from flashcard_ai.cache import get_cache, make_key
+from flashcard_ai.llm_client import chat_completion
+from flashcard_ai.prompts import build_text_prompts
+from flashcard_ai.chunker import split_into_chunks, select_chunks, merge_flashcards
+from flashcard_ai.dedupe import NearDuplicateIndex, dedupe_flashcards
+from flashcard_ai.concurrency import run_concurrently, stream_concurrently, CALL_TIMEOUT
+from flashcard_ai.stream_parser import CardStreamParser
+from flashcard_ai.response_parser import request_flashcards, validate_card
+from flashcard_ai.singleflight import single_flight
 
-# Load environment variables
-load_dotenv()
+# Shared cache of generated flashcards, keyed by input text and options
+generation_cache = get_cache('flashcards')
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def placeholder_flashcards(extract_definitions=False, create_cloze=False, question_answer=True):
+    """Basic cards for each requested section, used when no real cards could be generated"""
+    flashcards = {}
+    if question_answer:
+        flashcards["main"] = [{"question": "What is this text about?", "answer": "Key concepts from the provided text."}]
+    if extract_definitions:
+        flashcards["definitions"] = [{"question": "What is an important term?", "answer": "Definition of that term."}]
+    if create_cloze:
+        flashcards["cloze"] = [{"question": "This text discusses important _____.", "answer": "concepts"}]
+    return flashcards
 
-def generate_flashcards(text, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5"):
+def generate_flashcards(text, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5", fallback=True):
     """
     Generate flashcards from text using OpenAI's API
     
@@ -20,154 +33,231 @@ def generate_flashcards(text, difficulty='easy', extract_definitions=False, crea
         create_cloze (bool): Whether to create cloze deletions
         question_answer (bool): Whether to create question-answer pairs
         model (str): OpenAI model to use ('gpt-3.5-turbo', 'gpt-4')
+        fallback (bool): Return placeholder cards if generation fails; when False
+                         None is returned instead, e.g. for one chunk of many
         
     Returns:
-        dict: Dictionary containing different types of flashcards
+        dict: Dictionary containing different types of flashcards, or None
+              if generation failed and fallback is False
     """
+    # Identical text and options always map to the same cards, so reuse them
+    cache_key = make_key('flashcards', text, difficulty, extract_definitions, create_cloze, question_answer, model)
+    cached = generation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Identical requests already in flight wait for that call instead of making their own
+    flashcards = single_flight(
+        cache_key,
+        lambda: _generate_flashcards(cache_key, text, difficulty, extract_definitions, create_cloze, question_answer, model)
+    )
+    if flashcards is None and fallback:
+        return placeholder_flashcards(extract_definitions, create_cloze, question_answer)
+    return flashcards
+
+def _finish_flashcards(flashcards, extract_definitions, create_cloze, question_answer):
+    """Tidy parsed cards into the shape stored under a generate_flashcards cache key"""
+    # The same fact often comes back in both main and definitions
+    flashcards = dedupe_flashcards(flashcards)
+    
+    # Ensure all requested sections exist with at least empty arrays
+    if question_answer and "main" not in flashcards:
+        flashcards["main"] = []
+    if extract_definitions and "definitions" not in flashcards:
+        flashcards["definitions"] = []
+    if create_cloze and "cloze" not in flashcards:
+        flashcards["cloze"] = []
+    
+    return flashcards
+
+def _generate_flashcards(cache_key, text, difficulty, extract_definitions, create_cloze, question_answer, model):
+    """Call the model for generate_flashcards, caching results under cache_key; None on failure"""
+    # Another worker may have finished the same call just before this one started
+    cached = generation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        # Determine number of cards based on difficulty
-        if difficulty == 'easy':
-            num_cards = 5
-        elif difficulty == 'medium':
-            num_cards = 10
-        else:  # hard
-            num_cards = 15
-        
-        # Prepare detailed instructions for each card type
-        instructions = []
-        output_format = {}
-        
-        if question_answer:
-            instructions.append("""
-            Question-Answer pairs:
-            - Identify key concepts, facts, and relationships
-            - Create direct questions that test understanding
-            - Format as {"question": "What is X?", "answer": "X is Y"}
-            - Ensure answers are comprehensive yet concise
-            - Focus on conceptual understanding rather than mere facts
-            """)
-            output_format["main"] = "List of question-answer objects with 'question' and 'answer' keys"
-        
-        if extract_definitions:
-            instructions.append("""
-            Definitions:
-            - Identify important terms and concepts in the text
-            - Create definition cards with the term as the question
-            - Format as {"question": "What is [term]?", "answer": "definition of the term"}
-            - Ensure definitions are accurate and capture the essence of the term
-            """)
-            output_format["definitions"] = "List of definition objects with 'question' and 'answer' keys"
-        
-        if create_cloze:
-            instructions.append("""
-            Fill-in-the-blank:
-            - Take important sentences and replace key terms with blanks
-            - The question should contain the sentence with a blank (use "_____")
-            - The answer should be the missing word or phrase
-            - Format as {"question": "Process of _____ involves cell division", "answer": "mitosis"}
-            - Focus on terms that are central to understanding the concept
-            """)
-            output_format["cloze"] = "List of cloze deletion objects with 'question' and 'answer' keys"
-        
-        # Default if nothing is selected
-        if not instructions:
-            instructions.append("Create basic question-answer pairs")
-            output_format["main"] = "List of question-answer objects"
-        
-        # Create enhanced prompts for GPT-4
-        system_prompt = """
-        You are an expert educator who creates high-quality flashcards from text.
-        You must strictly follow the requested format for each flashcard type.
-        Separate your output into the exact requested categories (main, definitions, cloze).
-        
-        IMPORTANT: You must generate the flashcards in the SAME LANGUAGE as the input text.
-        If the input text is in French, create French flashcards. If it's in Spanish, create Spanish flashcards, etc.
-        Never translate the content to another language - maintain the original language throughout.
-        
-        Guidelines for creating excellent flashcards:
-        1. Each card should focus on a single concept or fact
-        2. Questions should be clear and unambiguous
-        3. Answers should be comprehensive yet concise
-        4. Prioritize understanding over memorization
-        5. Create flashcards that build upon each other in complexity
-        6. Ensure factual accuracy and clarity in all cards
-        """
-        
-        user_prompt = f"""
-        Create flashcards from the following text, with a total of approximately {num_cards} cards distributed across the requested types.
-        Difficulty level: {difficulty}
-        
-        Instructions for card types:
-        {' '.join(instructions)}
-        
-        Format your response as a JSON object with these specific keys:
-        {json.dumps(output_format, indent=2)}
-        
-        IMPORTANT: 
-        - Generate all flashcards in the SAME LANGUAGE as the input text
-        - DO NOT translate the content to another language
-        - DO NOT mix card types - each type must go in its own specific section
-        - For definition cards, focus ONLY on terminology definitions
-        - For cloze cards, ALWAYS include blanks (____) in the question
-        - Make all content concise and clear
-        - For {difficulty} difficulty, ensure appropriate complexity: {'basic recall for beginners' if difficulty == 'easy' else 'deeper understanding and connections' if difficulty == 'medium' else 'advanced application and critical thinking'}
-        
-        TEXT TO PROCESS:
-        {text}
-        """
+        system_prompt, user_prompt = build_text_prompts(
+            text,
+            difficulty=difficulty,
+            extract_definitions=extract_definitions,
+            create_cloze=create_cloze,
+            question_answer=question_answer
+        )
         
-        # Call the OpenAI API
-        response = client.chat.completions.create(
+        # Call the OpenAI API and parse the cards out of the response
+        flashcards = request_flashcards(
+            chat_completion,
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.7,
-            max_tokens=2000
+            max_tokens=2000,
+            timeout=CALL_TIMEOUT
         )
         
-        # Extract and parse the content
-        content = response.choices[0].message.content
-        
-        # Clean up the response to ensure it's valid JSON
-        content = content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        try:
-            # Parse the JSON
-            flashcards = json.loads(content)
-        except json.JSONDecodeError:
-            print(f"Error parsing JSON response: {content[:100]}...")
-            # Create a basic structure based on requirements
-            flashcards = {}
-            if question_answer:
-                flashcards["main"] = [{"question": "What is this text about?", "answer": "Key concepts from the provided text."}]
-            if extract_definitions:
-                flashcards["definitions"] = [{"question": "What is an important term?", "answer": "Definition of that term."}]
-            if create_cloze:
-                flashcards["cloze"] = [{"question": "This text discusses important _____.", "answer": "concepts"}]
+        if flashcards is None:
+            return None
         
-        # Ensure all requested sections exist with at least empty arrays
-        if question_answer and "main" not in flashcards:
-            flashcards["main"] = []
-        if extract_definitions and "definitions" not in flashcards:
-            flashcards["definitions"] = []
-        if create_cloze and "cloze" not in flashcards:
-            flashcards["cloze"] = []
+        flashcards = _finish_flashcards(flashcards, extract_definitions, create_cloze, question_answer)
+        generation_cache.set(cache_key, flashcards)
         
         return flashcards
         
     except Exception as e:
         print(f"Error generating flashcards with OpenAI: {e}")
-        # Return basic cards on error
-        return {
-            "main": [
-                {"question": "What is the main topic of this text?", 
-                 "answer": "Review the text to identify key concepts."}
-            ]
-        }
\ No newline at end of file
+        # The caller decides whether placeholder cards are wanted
+        return None
+
+def generate_chunked_flashcards(chunks, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5"):
+    """
+    Generate flashcards for each chunk of a document and merge the results
+    
+    Args:
+        chunks (list): Text chunks, each within the per-request token budget
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+        model (str): OpenAI model to use ('gpt-3.5-turbo', 'gpt-4')
+        
+    Returns:
+        dict: Dictionary containing different types of flashcards
+    """
+    # Keep the number of LLM calls bounded on very long documents
+    chunks = select_chunks(chunks)
+    
+    # Generate every chunk in parallel; results come back in document order
+    results = run_concurrently(
+        lambda chunk: generate_flashcards(
+            chunk,
+            difficulty=difficulty,
+            extract_definitions=extract_definitions,
+            create_cloze=create_cloze,
+            question_answer=question_answer,
+            model=model,
+            fallback=False
+        ),
+        chunks
+    )
+    
+    # Chunks that failed are left out; placeholders only when nothing worked
+    results = [flashcards for flashcards in results if flashcards is not None]
+    if not results:
+        return placeholder_flashcards(extract_definitions, create_cloze, question_answer)
+    
+    return merge_flashcards(results)
+
+def generate_document_flashcards(text, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5"):
+    """
+    Generate flashcards covering the whole of a possibly long document
+    
+    The text is split into chunks on paragraph boundaries so each request
+    stays within the token budget, instead of truncating the document.
+    
+    Args:
+        text (str): Processed text
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+        model (str): OpenAI model to use ('gpt-3.5-turbo', 'gpt-4')
+        
+    Returns:
+        dict: Dictionary containing different types of flashcards
+    """
+    chunks = split_into_chunks(text) or [text]
+    
+    return generate_chunked_flashcards(
+        chunks,
+        difficulty=difficulty,
+        extract_definitions=extract_definitions,
+        create_cloze=create_cloze,
+        question_answer=question_answer,
+        model=model
+    )
+
+def _stream_chunk(text, difficulty, extract_definitions, create_cloze, question_answer, model):
+    """Stream (section, card) tuples for a single chunk, caching the complete result"""
+    cache_key = make_key('flashcards', text, difficulty, extract_definitions, create_cloze, question_answer, model)
+    cached = generation_cache.get(cache_key)
+    if cached is not None:
+        for section, cards in cached.items():
+            for card in cards:
+                yield section, card
+        return
+    
+    system_prompt, user_prompt = build_text_prompts(
+        text,
+        difficulty=difficulty,
+        extract_definitions=extract_definitions,
+        create_cloze=create_cloze,
+        question_answer=question_answer
+    )
+    
+    # Ask for a streamed response so cards can be shown while the rest is written
+    response = chat_completion(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.7,
+        max_tokens=2000,
+        timeout=CALL_TIMEOUT,
+        stream=True
+    )
+    
+    parser = CardStreamParser()
+    flashcards = {}
+    
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        for section, card in parser.feed(delta):
+            card = validate_card(card)
+            if section is None or card is None:
+                continue
+            flashcards.setdefault(section, []).append(card)
+            yield section, card
+    
+    # generate_flashcards reads the same key, so store what it would have stored
+    if flashcards:
+        generation_cache.set(cache_key, _finish_flashcards(flashcards, extract_definitions, create_cloze, question_answer))
+
+def stream_flashcards(text, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True, model="gpt-3.5"):
+    """
+    Generate flashcards from text, yielding each card as soon as the model writes it
+    
+    Long text is split into chunks like generate_document_flashcards. The
+    chunks are streamed in parallel and cards are yielded as each chunk
+    produces them, so cards from different chunks arrive interleaved.
+    
+    Args:
+        text (str): Processed text
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+        model (str): OpenAI model to use ('gpt-3.5-turbo', 'gpt-4')
+        
+    Yields:
+        tuple: (section, card) where section is 'main', 'definitions' or 'cloze'
+    """
+    chunks = select_chunks(split_into_chunks(text) or [text])
+    seen = NearDuplicateIndex()
+    
+    def stream_chunk(chunk):
+        return _stream_chunk(chunk, difficulty, extract_definitions, create_cloze, question_answer, model)
+    
+    # A single chunk streams on the request thread; more go through the shared call limit in parallel
+    cards = stream_chunk(chunks[0]) if len(chunks) == 1 else stream_concurrently(stream_chunk, chunks)
+    
+    for section, card in cards:
+        # Skip cards that repeat one already sent, even from another section
+        if seen.add(card):
+            yield section, card
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flashcard_ai.metrics import inc, timer, start_log, finish_log
+
+# Job queue configuration (can be overridden from the environment)
+JOBS_PATH = os.environ.get('FLASHCARD_JOBS_PATH', os.path.join(tempfile.gettempdir(), 'flashcard_jobs.db'))
+JOB_WORKERS = int(os.environ.get('FLASHCARD_JOB_WORKERS', 4))
+JOB_RETENTION = int(os.environ.get('FLASHCARD_JOB_RETENTION', 24 * 3600))
+# A queued or running job that hasn't been updated for this long was lost with its worker
+JOB_STALE_AFTER = int(os.environ.get('FLASHCARD_JOB_STALE_AFTER', 300))
+
+_local = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+def _connect():
+    # Job state lives in SQLite so any gunicorn worker can answer status requests
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(JOBS_PATH, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+            "progress REAL NOT NULL DEFAULT 0, message TEXT, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='flashcard-job')
+        return _executor
+
+def _update(job_id, **fields):
+    fields['updated_at'] = time.time()
+    columns = ', '.join(f"{name} = ?" for name in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+def report_progress(message, progress=None):
+    """
+    Report progress for the job running on the current thread
+
+    Does nothing when called outside of a job, so generation code can
+    report progress without caring whether it runs in the background.
+
+    Args:
+        message (str): Short description of the current stage
+        progress (float): Fraction of the job completed, from 0 to 1
+    """
+    job_id = getattr(_local, 'job_id', None)
+    if job_id is None:
+        return
+    fields = {'message': message}
+    if progress is not None:
+        fields['progress'] = progress
+    try:
+        _update(job_id, **fields)
+    except sqlite3.Error as e:
+        print(f"Error reporting job progress: {e}")
+
+def _run(job_id, kind, func, args, kwargs):
+    _local.job_id = job_id
+    log = start_log(job_id=job_id, kind=kind)
+    status = 'failed'
+    try:
+        _update(job_id, status='running', message='Started')
+        with timer('job', kind=kind):
+            result = func(*args, **kwargs)
+        _update(job_id, status='done', progress=1, message='Finished', result=json.dumps(result))
+        status = 'done'
+    except Exception as e:
+        print(f"Error in background job {job_id}: {e}")
+        try:
+            _update(job_id, status='failed', message='Failed', error=str(e))
+        except sqlite3.Error as db_error:
+            print(f"Error recording job failure: {db_error}")
+    finally:
+        _local.job_id = None
+        inc('jobs_total', kind=kind, status=status)
+        finish_log(log, status=status)
+
+def submit_job(kind, func, *args, **kwargs):
+    """
+    Queue a function to run on the background worker pool
+
+    Args:
+        kind (str): Type of job, e.g. 'generate' or 'generate_from_files'
+        func (callable): Function to run; its return value must be JSON-serialisable
+        *args, **kwargs: Arguments passed to the function
+
+    Returns:
+        str: Id of the new job
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _connect() as conn:
+        # Housekeeping: drop finished jobs nobody has collected
+        conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - JOB_RETENTION,))
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, message, created_at, updated_at) VALUES (?, ?, 'queued', 'Queued', ?, ?)",
+            (job_id, kind, now, now)
+        )
+    _get_executor().submit(_run, job_id, kind, func, args, kwargs)
+    return job_id
+
+def get_job(job_id):
+    """
+    Look up the status of a job
+
+    Args:
+        job_id (str): Id returned by submit_job
+
+    Returns:
+        dict: Job status, progress and (once finished) result or error, or None if unknown
+    """
+    # Jobs run in the worker that accepted them; if it was recycled or killed they never finish
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', message = 'Failed', error = ?, updated_at = ? "
+            "WHERE id = ? AND status IN ('queued', 'running') AND updated_at < ?",
+            ('The job was interrupted, please try again', now, job_id, now - JOB_STALE_AFTER)
+        )
+
+    row = _connect().execute(
+        "SELECT id, kind, status, progress, message, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+        (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+
+    job = {
+        'id': row[0],
+        'kind': row[1],
+        'status': row[2],
+        'progress': row[3],
+        'message': row[4],
+        'created_at': row[7],
+        'updated_at': row[8]
+    }
+    if row[2] == 'done':
+        job['result'] = json.loads(row[5]) if row[5] else None
+    elif row[2] == 'failed':
+        job['error'] = row[6]
+    return job
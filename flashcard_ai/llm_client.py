@@ -0,0 +1,292 @@
+import os
+import time
+import random
+import threading
+from dotenv import load_dotenv
+from flashcard_ai.chunker import estimate_tokens
+from flashcard_ai.metrics import inc, observe
+
+# Load environment variables
+load_dotenv()
+
+# LLM client configuration (can be overridden from the environment)
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get('FLASHCARD_LLM_RPM', 500))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get('FLASHCARD_LLM_TPM', 150000))
+LLM_MAX_CONCURRENCY = int(os.environ.get('FLASHCARD_LLM_CONCURRENCY', 8))
+LLM_MAX_RETRIES = int(os.environ.get('FLASHCARD_LLM_MAX_RETRIES', 4))
+LLM_BACKOFF_BASE = float(os.environ.get('FLASHCARD_LLM_BACKOFF_BASE', 0.5))
+LLM_BACKOFF_MAX = float(os.environ.get('FLASHCARD_LLM_BACKOFF_MAX', 20))
+LLM_MAX_WAIT = float(os.environ.get('FLASHCARD_LLM_MAX_WAIT', 60))
+BREAKER_FAILURES = int(os.environ.get('FLASHCARD_LLM_BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.environ.get('FLASHCARD_LLM_BREAKER_RESET', 30))
+
+class LLMUnavailableError(Exception):
+    """Raised when a call is refused locally: the circuit is open or the rate limit wait is too long"""
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that refills continuously
+
+    Args:
+        per_minute (float): Refill rate, which is also the bucket's capacity
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """
+        Take tokens from the bucket, going into debt if needed
+
+        Returns:
+            float: Seconds the caller should wait before going ahead
+        """
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self, amount):
+        """Give back tokens that were reserved but not used"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class CircuitBreaker:
+    """
+    Stops calling the API after repeated failures, then lets a trial call through
+
+    Args:
+        failure_threshold (int): Consecutive failures before the circuit opens
+        reset_timeout (float): Seconds the circuit stays open before a trial call
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        """Whether a call may go ahead right now"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            # Half-open: let exactly one call find out whether the API has recovered
+            self.trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Give up a trial call that ended without reaching the API, so another call can try"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    inc('llm_circuit_opened_total')
+                self.opened_at = time.monotonic()
+
+_client = None
+_client_lock = threading.Lock()
+
+_request_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+_token_bucket = TokenBucket(LLM_TOKENS_PER_MINUTE)
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_breaker = CircuitBreaker()
+
+def get_client():
+    """
+    Get the shared OpenAI client, creating it on first use
+
+    OPENAI_BASE_URL points the client at another server, e.g. a local fake
+    for load tests. The client's own retries are turned off since
+    chat_completion handles them.
+
+    Returns:
+        OpenAI: The client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            # The SDK takes a large share of start-up time, so it's only loaded for the first call
+            from openai import OpenAI
+            _client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                max_retries=0
+            )
+        return _client
+
+def _estimate_request_tokens(kwargs):
+    prompt_tokens = sum(estimate_tokens(message.get('content') or '') for message in kwargs.get('messages', []))
+    return prompt_tokens + (kwargs.get('max_tokens') or 0)
+
+def _is_retryable(error):
+    from openai import APIStatusError, APIConnectionError, APITimeoutError
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+def _is_api_response(error):
+    from openai import APIStatusError
+    return isinstance(error, APIStatusError)
+
+def _backoff(attempt, error):
+    # Honour the server's Retry-After when it gives one
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_BACKOFF_MAX)
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter, so throttled threads don't retry in lockstep
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+def _throttle(estimated_tokens):
+    wait = max(_request_bucket.reserve(1), _token_bucket.reserve(estimated_tokens))
+    if wait > LLM_MAX_WAIT:
+        _request_bucket.refund(1)
+        _token_bucket.refund(estimated_tokens)
+        inc('llm_rejected_total', reason='rate_limit')
+        raise LLMUnavailableError(f"Rate limit would delay the call by {wait:.0f}s")
+    if wait > 0:
+        inc('llm_throttled_seconds_total', wait)
+        time.sleep(wait)
+
+def _settle_tokens(response, estimated_tokens, model):
+    # Return the difference between the estimate and what the call really used
+    usage = getattr(response, 'usage', None)
+    total = getattr(usage, 'total_tokens', None)
+    if isinstance(total, int) and total < estimated_tokens:
+        _token_bucket.refund(estimated_tokens - total)
+
+    for kind in ('prompt', 'completion'):
+        tokens = getattr(usage, f'{kind}_tokens', None)
+        if isinstance(tokens, int):
+            inc('llm_tokens_total', tokens, kind=kind, model=model)
+
+def _stream_with_slot(stream):
+    # The concurrency slot is held until the whole streamed response has been read
+    try:
+        yield from stream
+        _breaker.record_success()
+    except Exception:
+        _breaker.record_failure()
+        raise
+    finally:
+        # A stream closed before the end settles nothing either way
+        _breaker.release_trial()
+        _slots.release()
+
+def chat_completion(**kwargs):
+    """
+    Call the chat completions API through the shared rate limiter
+
+    Calls are limited by a requests-per-minute and a tokens-per-minute
+    bucket and a concurrency cap shared by every thread in the process.
+    429s, 5xx responses and connection errors are retried with exponential
+    backoff and jitter; repeated failures open a circuit breaker so callers
+    fail fast (and fall back) while the API is down.
+
+    Args:
+        **kwargs: Arguments for chat.completions.create (model, messages, ...)
+
+    Returns:
+        The API response, or an iterator of chunks when stream=True
+
+    Raises:
+        LLMUnavailableError: If the circuit is open or the rate limit wait is too long
+    """
+    estimated_tokens = _estimate_request_tokens(kwargs)
+    client = get_client()
+    model = kwargs.get('model', '')
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if not _breaker.allow():
+            inc('llm_rejected_total', reason='circuit_open')
+            raise LLMUnavailableError("OpenAI API circuit is open after repeated failures")
+
+        try:
+            _throttle(estimated_tokens)
+            if not _slots.acquire(timeout=LLM_MAX_WAIT):
+                inc('llm_rejected_total', reason='no_free_slot')
+                raise LLMUnavailableError("Timed out waiting for a free LLM call slot")
+        except LLMUnavailableError:
+            # Refused before reaching the API: if this was the half-open trial, let another call make it
+            _breaker.release_trial()
+            raise
+
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            observe('llm_call', time.perf_counter() - start, model=model, outcome='error')
+            inc('llm_errors_total', model=model, error=type(e).__name__)
+            _slots.release()
+            retryable = _is_retryable(e)
+            if retryable:
+                _breaker.record_failure()
+            elif _is_api_response(e):
+                # The API answered, it just rejected this request
+                _breaker.record_success()
+            else:
+                _breaker.release_trial()
+            if not retryable or attempt == LLM_MAX_RETRIES:
+                inc('llm_failures_total', model=model)
+                raise
+
+            delay = _backoff(attempt, e)
+            print(f"Retrying OpenAI call in {delay:.1f}s after error: {e}")
+            inc('llm_retries_total', model=model)
+            time.sleep(delay)
+            continue
+
+        # For a streamed call this is the time until the response starts
+        observe('llm_call', time.perf_counter() - start, model=model, outcome='stream' if kwargs.get('stream') else 'ok')
+
+        if kwargs.get('stream'):
+            return _stream_with_slot(response)
+
+        _slots.release()
+        _breaker.record_success()
+        _settle_tokens(response, estimated_tokens, model)
+        return response
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Metrics configuration (can be overridden from the environment)
+# Every worker process writes its metrics here so /metrics can report all of them;
+# set it to an empty string to only report the process that serves the scrape.
+METRICS_DIR = os.environ.get('FLASHCARD_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'flashcard_metrics'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('FLASHCARD_METRICS_FLUSH_INTERVAL', 1))
+REQUEST_LOG = os.environ.get('FLASHCARD_REQUEST_LOG', 'true') == 'true'
+
+# Histogram buckets in seconds, from a cache hit up to a slow LLM call
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+_last_flush = 0.0
+
+# Stage timings of the request (or job) the current code is running for
+_current_log = contextvars.ContextVar('flashcard_request_log', default=None)
+
+logger = logging.getLogger('flashcard_ai.requests')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def inc(name, amount=1, **labels):
+    """
+    Add to a counter
+
+    Args:
+        name (str): Metric name, e.g. 'llm_tokens_total'
+        amount (float): Amount to add
+        **labels: Label values, e.g. kind='prompt'
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _maybe_flush()
+
+def observe(name, seconds, **labels):
+    """
+    Record a duration in a histogram, and in the current request's log
+
+    Args:
+        name (str): Stage name, e.g. 'llm_call'
+        seconds (float): Duration
+        **labels: Label values, e.g. model='gpt-4'
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        values = _histograms.get(key)
+        if values is None:
+            values = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+        values[-2] += 1
+        values[-1] += seconds
+
+    request_log = _current_log.get()
+    if request_log is not None:
+        with _lock:
+            stage = request_log['stages'].setdefault(name, {'count': 0, 'seconds': 0.0})
+            stage['count'] += 1
+            stage['seconds'] += seconds
+    _maybe_flush()
+
+@contextmanager
+def timer(name, **labels):
+    """
+    Time a block of code as a stage
+
+    Example:
+        with timer('process_text', format=format_type):
+            ...
+
+    Args:
+        name (str): Stage name
+        **labels: Label values
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def start_log(**fields):
+    """
+    Start collecting stage timings for a request or background job
+
+    Threads started with propagate_context() add their stages to the same log.
+
+    Args:
+        **fields: Fields included in the log line, e.g. method and path
+
+    Returns:
+        Token to pass to finish_log
+    """
+    return _current_log.set({'fields': fields, 'stages': {}, 'start': time.perf_counter()})
+
+def finish_log(token, **fields):
+    """
+    Write the structured log line for a request or job started with start_log
+
+    Args:
+        token: Value returned by start_log
+        **fields: More fields for the log line, e.g. status
+    """
+    request_log = _current_log.get()
+    _current_log.reset(token)
+    if request_log is None or not REQUEST_LOG:
+        return
+
+    with _lock:
+        stages = {
+            name: {'count': stage['count'], 'seconds': round(stage['seconds'], 4)}
+            for name, stage in request_log['stages'].items()
+        }
+    entry = dict(request_log['fields'], **fields)
+    entry['duration'] = round(time.perf_counter() - request_log['start'], 4)
+    entry['stages'] = stages
+    logger.info(json.dumps(entry))
+
+def propagate_context(func):
+    """
+    Wrap a function so it runs with the caller's request log when called on another thread
+
+    Args:
+        func (callable): Function to run on a worker thread
+
+    Returns:
+        callable: Wrapped function
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # Each call gets its own copy, since a context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def _snapshot():
+    with _lock:
+        return {
+            'counters': [[name, labels, value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, labels, list(values)] for (name, labels), values in _histograms.items()]
+        }
+
+def _maybe_flush():
+    global _last_flush
+    if not METRICS_DIR:
+        return
+    now = time.monotonic()
+    if now - _last_flush < METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    flush()
+
+def flush():
+    """Write this process's metrics to METRICS_DIR for the other workers to report"""
+    if not METRICS_DIR:
+        return
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(_snapshot(), f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+
+def clear_metrics():
+    """Forget this process's metrics, e.g. the values a forked worker inherited from the master"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def reset_metrics_dir():
+    """Remove metrics left by earlier runs; call once before the workers start"""
+    if METRICS_DIR:
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+def _collect():
+    # Start from this process's live values, then add every other worker's last flush
+    snapshots = [_snapshot()]
+    if METRICS_DIR and os.path.isdir(METRICS_DIR):
+        own = f"{os.getpid()}.json"
+        for filename in os.listdir(METRICS_DIR):
+            if filename == own or not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(METRICS_DIR, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            total = histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                total[i] += value
+    return counters, histograms
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+def render_prometheus():
+    """
+    Render all metrics in the Prometheus text exposition format
+
+    Counters are exported as flashcard_<name>, stage timings as the
+    flashcard_<name>_seconds histogram.
+
+    Returns:
+        str: Metrics text
+    """
+    counters, histograms = _collect()
+    lines = []
+
+    for name in sorted({name for name, _ in counters}):
+        metric = f"flashcard_{name}"
+        lines.append(f"# TYPE {metric} counter")
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for name in sorted({name for name, _ in histograms}):
+        metric = f"flashcard_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for (histogram_name, labels), values in sorted(histograms.items()):
+            if histogram_name != name:
+                continue
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-2]}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {round(values[-1], 6)}")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,90 @@
+import os
+import re
+import tempfile
+from flashcard_ai.metrics import timer
+
+# Rendered PDF cache configuration (can be overridden from the environment)
+PDF_CACHE_DIR = os.environ.get('FLASHCARD_PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'flashcard_pdfs'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('FLASHCARD_PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+_KEY = re.compile(r'^[0-9a-f]{64}$')
+
+def _path_for(key):
+    if not _KEY.match(key):
+        raise ValueError(f"Invalid PDF cache key: {key}")
+    return os.path.join(PDF_CACHE_DIR, f"{key}.pdf")
+
+def get_cached_pdf(key):
+    """
+    Look up a rendered PDF
+
+    Args:
+        key (str): Cache key from make_key
+
+    Returns:
+        str: Path of the cached PDF, or None if it hasn't been rendered yet
+    """
+    try:
+        path = _path_for(key)
+    except ValueError:
+        return None
+    if not os.path.exists(path):
+        return None
+    try:
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+    except OSError:
+        pass
+    return path
+
+def render_pdf_file(key, render):
+    """
+    Render a PDF into the cache
+
+    The file is written under a temporary name and moved into place, so
+    other workers never see a half-written PDF.
+
+    Args:
+        key (str): Cache key from make_key
+        render (callable): Function that writes the PDF to the path it is given
+
+    Returns:
+        str: Path of the cached PDF
+    """
+    path = _path_for(key)
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        with timer('pdf_render'):
+            render(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    _evict()
+    return path
+
+def _evict():
+    """Remove least recently used PDFs until the cache fits in PDF_CACHE_MAX_BYTES"""
+    try:
+        entries = []
+        for entry in os.scandir(PDF_CACHE_DIR):
+            if entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError as e:
+        print(f"Error scanning PDF cache: {e}")
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
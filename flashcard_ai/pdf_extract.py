@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# PDF extraction configuration (can be overridden from the environment)
+PDF_WORKERS = int(os.environ.get('FLASHCARD_PDF_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('FLASHCARD_PDF_PARALLEL_MIN_PAGES', 24))
+PDF_PAGES_PER_TASK = int(os.environ.get('FLASHCARD_PDF_PAGES_PER_TASK', 8))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _page_texts(stream, page_numbers=None):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    # One page at a time, so the whole document's layout is never held in memory
+    for page in extract_pages(stream, page_numbers=page_numbers):
+        # Each text box is a paragraph; whitespace is normalised later by the text processor
+        boxes = [element.get_text().strip() for element in page if isinstance(element, LTTextContainer)]
+        page_text = '\n\n'.join(box for box in boxes if box)
+        if page_text:
+            yield page_text + '\n\n'
+
+def extract_page_range(path, start, end):
+    """
+    Extract the text of a range of pages; runs inside the process pool
+
+    Args:
+        path (str): Path to the PDF file
+        start (int): First page number (0-based)
+        end (int): Page number to stop before
+
+    Returns:
+        str: Text of the pages in order
+    """
+    with open(path, 'rb') as stream:
+        return ''.join(_page_texts(stream, page_numbers=range(start, end)))
+
+def count_pages(stream):
+    """
+    Count the pages in a PDF without parsing their content
+
+    Args:
+        stream: Binary file object of the PDF
+
+    Returns:
+        int: Number of pages, or 0 if it couldn't be determined
+    """
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdftypes import resolve1
+
+    try:
+        document = PDFDocument(PDFParser(stream))
+        return int(resolve1(resolve1(document.catalog['Pages'])['Count']))
+    except Exception as e:
+        print(f"Error counting PDF pages: {e}")
+        return 0
+    finally:
+        stream.seek(0)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers only import this light module, not the whole app
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _discard_pool(pool):
+    # A broken pool refuses all new work, so the next caller starts a fresh one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _iter_parallel(stream, num_pages):
+    # Workers read the PDF from disk rather than each receiving a copy of it
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as temp:
+        shutil.copyfileobj(stream, temp)
+        temp.flush()
+
+        pool = _get_pool()
+        futures = []
+        done = 0
+        try:
+            for start in range(0, num_pages, PDF_PAGES_PER_TASK):
+                futures.append(pool.submit(extract_page_range, temp.name, start, min(start + PDF_PAGES_PER_TASK, num_pages)))
+
+            # Hand back each range in page order as soon as it is ready
+            for future in futures:
+                text = future.result()
+                done = min(done + PDF_PAGES_PER_TASK, num_pages)
+                yield text
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); finish this file on this thread
+            print(f"Error in PDF worker pool, extracting the remaining pages serially: {e}")
+            _discard_pool(pool)
+            with open(temp.name, 'rb') as pdf:
+                yield from _page_texts(pdf, page_numbers=range(done, num_pages))
+        finally:
+            for future in futures:
+                future.cancel()
+
+def iter_pdf_pages(stream):
+    """
+    Extract text from a PDF, in page order
+
+    Large PDFs are split into page ranges that are extracted in parallel on
+    a process pool (FLASHCARD_PDF_WORKERS); small ones are read serially
+    since starting the work costs more than it saves.
+
+    Args:
+        stream: Binary file object of the PDF, positioned at the start
+
+    Yields:
+        str: Text of a page, or of a range of pages in parallel mode
+    """
+    if PDF_WORKERS > 1:
+        num_pages = count_pages(stream)
+        if num_pages >= PDF_PARALLEL_MIN_PAGES:
+            yield from _iter_parallel(stream, num_pages)
+            return
+
+    yield from _page_texts(stream)
@@ -0,0 +1,306 @@
+import re
+import sys
+import json
+import itertools
+from functools import lru_cache
+from flashcard_ai.chunker import estimate_tokens
+from flashcard_ai.metrics import timer
+
+_encoding = None
+
+def count_tokens(text):
+    """Count tokens exactly with tiktoken when it is installed, estimate them otherwise"""
+    global _encoding
+    if _encoding is None:
+        # Loaded on first use: only the budget check needs exact counts
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except ImportError:
+            _encoding = False
+    if _encoding is False:
+        return estimate_tokens(text)
+    return len(_encoding.encode(text))
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Most tokens a prompt template may use, without the user's text or topic.
+# `python -m flashcard_ai.prompts` fails when a template grows past these;
+# tests/test_prompts.py pins the exact count of every variant.
+TEXT_PROMPT_BUDGET = 700
+TOPIC_PROMPT_BUDGET = 440
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+def compact(text):
+    """
+    Strip the indentation and extra blank lines a triple-quoted prompt picks up
+
+    Args:
+        text (str): Prompt text
+
+    Returns:
+        str: The same prompt without the whitespace the model would pay tokens for
+    """
+    lines = (line.strip() for line in text.strip().splitlines())
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines))
+
+def _difficulty(difficulty):
+    # Anything unrecognised has always been treated as hard
+    return difficulty if difficulty in DIFFICULTIES else 'hard'
+
+def _complexity(difficulty):
+    if difficulty == 'easy':
+        return 'basic recall for beginners'
+    if difficulty == 'medium':
+        return 'deeper understanding and connections'
+    return 'advanced application and critical thinking'
+
+TEXT_SYSTEM_PROMPT = compact("""
+    You are an expert educator who creates high-quality flashcards from text.
+    You must strictly follow the requested format for each flashcard type.
+    Separate your output into the exact requested categories (main, definitions, cloze).
+
+    IMPORTANT: You must generate the flashcards in the SAME LANGUAGE as the input text.
+    If the input text is in French, create French flashcards. If it's in Spanish, create Spanish flashcards, etc.
+    Never translate the content to another language - maintain the original language throughout.
+
+    Guidelines for creating excellent flashcards:
+    1. Each card should focus on a single concept or fact
+    2. Questions should be clear and unambiguous
+    3. Answers should be comprehensive yet concise
+    4. Prioritize understanding over memorization
+    5. Create flashcards that build upon each other in complexity
+    6. Ensure factual accuracy and clarity in all cards
+    """)
+
+TOPIC_SYSTEM_PROMPT = compact("""
+    You are an expert educator who creates high-quality flashcards about specific topics.
+    Your goal is to create effective study materials that help users learn important concepts.
+
+    IMPORTANT: You must generate the flashcards in the SAME LANGUAGE as the topic input.
+    If the topic is in French, create French flashcards. If it's in Spanish, create Spanish flashcards, etc.
+    Never translate the content to another language - maintain the original language throughout.
+
+    Guidelines for creating excellent flashcards:
+    1. Each card should focus on a single concept or fact
+    2. Questions should be clear and promote critical thinking
+    3. Answers should be comprehensive yet concise
+    4. Prioritize understanding over memorization
+    5. Create flashcards that build upon each other in complexity
+    6. Ensure factual accuracy and clarity in all cards
+    """)
+
+_QUESTION_ANSWER_INSTRUCTIONS = compact("""
+    Question-Answer pairs:
+    - Identify key concepts, facts, and relationships
+    - Create direct questions that test understanding
+    - Format as {"question": "What is X?", "answer": "X is Y"}
+    - Ensure answers are comprehensive yet concise
+    - Focus on conceptual understanding rather than mere facts
+    """)
+
+_DEFINITION_INSTRUCTIONS = compact("""
+    Definitions:
+    - Identify important terms and concepts in the text
+    - Create definition cards with the term as the question
+    - Format as {"question": "What is [term]?", "answer": "definition of the term"}
+    - Ensure definitions are accurate and capture the essence of the term
+    """)
+
+_CLOZE_INSTRUCTIONS = compact("""
+    Fill-in-the-blank:
+    - Take important sentences and replace key terms with blanks
+    - The question should contain the sentence with a blank (use "_____")
+    - The answer should be the missing word or phrase
+    - Format as {"question": "Process of _____ involves cell division", "answer": "mitosis"}
+    - Focus on terms that are central to understanding the concept
+    """)
+
+# One entry per difficulty and combination of the three card type flags
+_TEMPLATE_VARIANTS = len(DIFFICULTIES) * 2 ** 3
+
+@lru_cache(maxsize=_TEMPLATE_VARIANTS)
+def text_prompt_template(difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True):
+    """
+    Get the precompiled user prompt for text flashcards, without the text itself
+
+    Args:
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+
+    Returns:
+        str: Prompt that the text to process is appended to
+    """
+    difficulty = _difficulty(difficulty)
+    num_cards = {'easy': 5, 'medium': 10, 'hard': 15}[difficulty]
+
+    instructions = []
+    output_format = {}
+
+    if question_answer:
+        instructions.append(_QUESTION_ANSWER_INSTRUCTIONS)
+        output_format["main"] = "List of question-answer objects with 'question' and 'answer' keys"
+    if extract_definitions:
+        instructions.append(_DEFINITION_INSTRUCTIONS)
+        output_format["definitions"] = "List of definition objects with 'question' and 'answer' keys"
+    if create_cloze:
+        instructions.append(_CLOZE_INSTRUCTIONS)
+        output_format["cloze"] = "List of cloze deletion objects with 'question' and 'answer' keys"
+
+    # Default if nothing is selected
+    if not instructions:
+        instructions.append("Create basic question-answer pairs")
+        output_format["main"] = "List of question-answer objects"
+
+    # f-string expressions can't contain backslashes
+    separator = '\n\n'
+    return compact(f"""
+        Create flashcards from the following text, with a total of approximately {num_cards} cards distributed across the requested types.
+        Difficulty level: {difficulty}
+
+        Instructions for card types:
+        {separator.join(instructions)}
+
+        Format your response as a JSON object with these specific keys:
+        {json.dumps(output_format)}
+
+        IMPORTANT:
+        - Generate all flashcards in the SAME LANGUAGE as the input text
+        - DO NOT translate the content to another language
+        - DO NOT mix card types - each type must go in its own specific section
+        - For definition cards, focus ONLY on terminology definitions
+        - For cloze cards, ALWAYS include blanks (____) in the question
+        - Make all content concise and clear
+        - For {difficulty} difficulty, ensure appropriate complexity: {_complexity(difficulty)}
+
+        TEXT TO PROCESS:
+        """) + '\n'
+
+@lru_cache(maxsize=_TEMPLATE_VARIANTS)
+def topic_prompt_template(difficulty='easy', include_definitions=False, include_facts=False, include_dates=False):
+    """
+    Get the precompiled user prompt for topic flashcards, split around the topic
+
+    Args:
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        include_definitions (bool): Whether to include definitions
+        include_facts (bool): Whether to include facts
+        include_dates (bool): Whether to include dates
+
+    Returns:
+        tuple: (text before the topic, text between the topic and the research notes)
+    """
+    difficulty = _difficulty(difficulty)
+    num_cards = {'easy': 5, 'medium': 8, 'hard': 10}[difficulty]
+
+    card_types = []
+    if include_facts:
+        card_types.append("fact-based question-answer pairs")
+    if include_definitions:
+        card_types.append("key term definitions")
+    if include_dates:
+        card_types.append("important dates and timeline events")
+
+    # Default if nothing is selected
+    if not card_types:
+        card_types = ["general knowledge question-answer pairs"]
+
+    before_topic = f"Please create {num_cards} flashcards about the topic: "
+    after_topic = '\n' + compact(f"""
+        Difficulty level: {difficulty}
+
+        Include these card types: {', '.join(card_types)}.
+
+        Format your response as a JSON object with these keys:
+        - "main": A list of question-answer flashcards with "question" and "answer" keys
+        - "definitions": A list of term definition flashcards (if requested)
+        - "cloze": A list of fill-in-the-blank flashcards (if requested)
+
+        Each list should contain objects with "question" and "answer" keys.
+        Make the content concise, clear, and focused on the most important concepts.
+
+        IMPORTANT:
+        - Generate all flashcards in the SAME LANGUAGE as the topic input
+        - DO NOT translate the content to another language
+        - For {difficulty} difficulty, ensure appropriate complexity: {_complexity(difficulty)}
+
+        Use this information if relevant:
+        """) + '\n'
+    return before_topic, after_topic
+
+def build_text_prompts(text, difficulty='easy', extract_definitions=False, create_cloze=False, question_answer=True):
+    """
+    Build the system and user prompts for flashcards generated from text
+
+    Args:
+        text (str): Processed text
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        extract_definitions (bool): Whether to extract definitions
+        create_cloze (bool): Whether to create cloze deletions
+        question_answer (bool): Whether to create question-answer pairs
+
+    Returns:
+        tuple: (system_prompt, user_prompt)
+    """
+    with timer('prompt_build', kind='text'):
+        # Normalised first so odd difficulty strings share the 'hard' cache entry
+        template = text_prompt_template(_difficulty(difficulty), bool(extract_definitions), bool(create_cloze), bool(question_answer))
+        return TEXT_SYSTEM_PROMPT, template + text
+
+def build_topic_prompts(topic, topic_text, difficulty='easy', include_definitions=False, include_facts=False, include_dates=False):
+    """
+    Build the system and user prompts for flashcards about a topic
+
+    Args:
+        topic (str): Topic to generate flashcards for
+        topic_text (str): Research notes about the topic, or a plain instruction
+        difficulty (str): Difficulty level ('easy', 'medium', 'hard')
+        include_definitions (bool): Whether to include definitions
+        include_facts (bool): Whether to include facts
+        include_dates (bool): Whether to include dates
+
+    Returns:
+        tuple: (system_prompt, user_prompt)
+    """
+    with timer('prompt_build', kind='topic'):
+        before_topic, after_topic = topic_prompt_template(_difficulty(difficulty), bool(include_definitions), bool(include_facts), bool(include_dates))
+        return TOPIC_SYSTEM_PROMPT, before_topic + topic + after_topic + topic_text
+
+def prompt_token_counts():
+    """
+    Count the tokens of every prompt variant, without the user's text or topic
+
+    Returns:
+        dict: {(kind, difficulty, flags...): tokens of the system and user prompt together}
+    """
+    counts = {}
+    for difficulty in DIFFICULTIES:
+        for flags in itertools.product((False, True), repeat=3):
+            system_prompt, user_prompt = build_text_prompts('', difficulty, *flags)
+            counts[('text', difficulty) + flags] = count_tokens(system_prompt) + count_tokens(user_prompt)
+
+            system_prompt, user_prompt = build_topic_prompts('', '', difficulty, *flags)
+            counts[('topic', difficulty) + flags] = count_tokens(system_prompt) + count_tokens(user_prompt)
+    return counts
+
+def check_prompt_budget():
+    """
+    Report the token cost of every prompt variant and check it against the budget
+
+    Returns:
+        bool: True if every variant is within its budget
+    """
+    budgets = {'text': TEXT_PROMPT_BUDGET, 'topic': TOPIC_PROMPT_BUDGET}
+    within_budget = True
+    for variant, tokens in sorted(prompt_token_counts().items()):
+        budget = budgets[variant[0]]
+        status = 'ok' if tokens <= budget else 'OVER BUDGET'
+        within_budget = within_budget and tokens <= budget
+        print(f"{' '.join(str(part) for part in variant):<40} {tokens:>5} / {budget} {status}")
+    return within_budget
+
+if __name__ == '__main__':
+    sys.exit(0 if check_prompt_budget() else 1)
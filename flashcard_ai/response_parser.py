@@ -0,0 +1,176 @@
+import os
+import json
+from flashcard_ai.stream_parser import CardStreamParser
+from flashcard_ai.metrics import inc, timer
+
+# Number of extra calls made when a response contains no usable cards
+MAX_PARSE_RETRIES = int(os.environ.get('FLASHCARD_PARSE_RETRIES', 1))
+
+# Models that support OpenAI's JSON mode (response_format={"type": "json_object"})
+JSON_MODE_MODELS = ('gpt-3.5-turbo', 'gpt-4-turbo', 'gpt-4o', 'gpt-4-1106', 'gpt-4-0125')
+
+def response_format_for(model):
+    """
+    Get the response_format argument to request JSON mode, if the model supports it
+
+    Args:
+        model (str): OpenAI model name
+
+    Returns:
+        dict: response_format value, or None if the model doesn't support JSON mode
+    """
+    if model and model.startswith(JSON_MODE_MODELS):
+        return {"type": "json_object"}
+    return None
+
+def extract_json_object(content):
+    """
+    Find and decode the first JSON object in a model response
+
+    Tolerates code fences, leading prose and trailing text after the object.
+
+    Args:
+        content (str): Raw model output
+
+    Returns:
+        dict: Decoded object, or None if no complete object could be found
+    """
+    if not content:
+        return None
+
+    decoder = json.JSONDecoder()
+    start = content.find('{')
+    while start != -1:
+        try:
+            obj, _ = decoder.raw_decode(content, start)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        start = content.find('{', start + 1)
+    return None
+
+def validate_card(card):
+    """
+    Check a single card and normalise it to {"question": ..., "answer": ...}
+
+    Args:
+        card: Candidate card from the model output
+
+    Returns:
+        dict: Normalised card, or None if the card is unusable
+    """
+    if not isinstance(card, dict):
+        return None
+
+    # Models sometimes answer with front/back instead of question/answer
+    question = card.get('question', card.get('front'))
+    answer = card.get('answer', card.get('back'))
+    if isinstance(question, (int, float)):
+        question = str(question)
+    if isinstance(answer, (int, float)):
+        answer = str(answer)
+    if not isinstance(question, str) or not isinstance(answer, str):
+        return None
+
+    question = question.strip()
+    answer = answer.strip()
+    if not question or not answer:
+        return None
+
+    return {'question': question, 'answer': answer}
+
+def _validate_sections(obj):
+    flashcards = {}
+    for section, cards in obj.items():
+        if not isinstance(cards, list):
+            continue
+        valid = []
+        for card in cards:
+            checked = validate_card(card)
+            if checked is None:
+                inc('llm_invalid_cards_total')
+                continue
+            valid.append(checked)
+        flashcards[section] = valid
+    return flashcards
+
+def salvage_cards(content):
+    """
+    Recover every complete card from a truncated response
+
+    Args:
+        content (str): Raw model output that was cut off, e.g. by max_tokens
+
+    Returns:
+        dict: Dictionary of the complete cards found, grouped by section
+    """
+    parser = CardStreamParser()
+    flashcards = {}
+    for section, card in parser.feed(content or ''):
+        checked = validate_card(card)
+        if section is None or checked is None:
+            continue
+        flashcards.setdefault(section, []).append(checked)
+    return flashcards
+
+def parse_flashcards(content):
+    """
+    Parse a model response into validated flashcards
+
+    Args:
+        content (str): Raw model output
+
+    Returns:
+        dict: Dictionary of valid cards grouped by section, or None if the
+              response contained no usable cards
+    """
+    obj = extract_json_object(content)
+    if obj is not None:
+        flashcards = _validate_sections(obj)
+        if any(flashcards.values()):
+            inc('llm_responses_total', outcome='parsed')
+            return flashcards
+
+    # Fall back to picking out whatever complete cards made it through
+    flashcards = salvage_cards(content)
+    if any(flashcards.values()):
+        inc('llm_responses_total', outcome='salvaged')
+        return flashcards
+
+    inc('llm_responses_total', outcome='failed')
+    print(f"Error parsing JSON response: {(content or '')[:100]}...")
+    return None
+
+def request_flashcards(create, model, messages, retries=MAX_PARSE_RETRIES, **kwargs):
+    """
+    Call the chat completions API and parse the result into flashcards
+
+    Requests JSON mode where the model supports it and retries when a
+    response contains no usable cards at all.
+
+    Args:
+        create (callable): Chat completions create function
+        model (str): OpenAI model to use
+        messages (list): Chat messages
+        retries (int): Extra attempts allowed after an unusable response
+        **kwargs: Other arguments for the API call (temperature, max_tokens, ...)
+
+    Returns:
+        dict: Dictionary of valid cards grouped by section, or None if every attempt failed
+    """
+    response_format = response_format_for(model)
+    if response_format is not None:
+        kwargs['response_format'] = response_format
+
+    for attempt in range(retries + 1):
+        if attempt:
+            inc('llm_parse_retries_total')
+
+        response = create(model=model, messages=messages, **kwargs)
+        with timer('json_parse'):
+            flashcards = parse_flashcards(response.choices[0].message.content)
+        if flashcards is not None:
+            return flashcards
+
+    return None
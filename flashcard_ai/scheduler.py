@@ -0,0 +1,71 @@
+import math
+from datetime import datetime, timedelta
+
+# Grades follow SM-2: 0-2 are failed recalls, 3 is hard, 4 is good and 5 is easy
+MIN_GRADE = 0
+MAX_GRADE = 5
+PASSING_GRADE = 3
+
+MIN_EASE = 1.3
+
+def schedule(ease_factor, interval, repetitions, grade, now=None):
+    """
+    Work out a card's next review with the SM-2 algorithm
+
+    Args:
+        ease_factor (float): Current ease factor (2.5 for a new card)
+        interval (int): Current interval in days (0 for a new card)
+        repetitions (int): Successful reviews in a row
+        grade (int): Recall quality from 0 (blackout) to 5 (perfect)
+        now (datetime): Review time, defaults to the current UTC time
+
+    Returns:
+        dict: New ease_factor, interval, repetitions and due_at
+    """
+    if not MIN_GRADE <= grade <= MAX_GRADE:
+        raise ValueError(f"Grade must be between {MIN_GRADE} and {MAX_GRADE}")
+    now = now or datetime.utcnow()
+
+    if grade >= PASSING_GRADE:
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = math.ceil(interval * ease_factor)
+        repetitions += 1
+    else:
+        # Forgotten cards start over, but keep their (lowered) ease
+        repetitions = 0
+        interval = 1
+
+    miss = MAX_GRADE - grade
+    ease_factor = max(MIN_EASE, ease_factor + 0.1 - miss * (0.08 + miss * 0.02))
+
+    return {
+        'ease_factor': round(ease_factor, 4),
+        'interval': interval,
+        'repetitions': repetitions,
+        'due_at': now + timedelta(days=interval)
+    }
+
+def review_card(card, grade, now=None):
+    """
+    Record a review on a Card, updating its scheduling state in place
+
+    Args:
+        card (Card): Card that was reviewed
+        grade (int): Recall quality from 0 to 5
+        now (datetime): Review time, defaults to the current UTC time
+
+    Returns:
+        Card: The same card
+    """
+    now = now or datetime.utcnow()
+    state = schedule(card.ease_factor or 2.5, card.interval or 0, card.repetitions or 0, grade, now)
+    card.ease_factor = state['ease_factor']
+    card.interval = state['interval']
+    card.repetitions = state['repetitions']
+    card.due_at = state['due_at']
+    card.last_reviewed_at = now
+    return card
@@ -0,0 +1,216 @@
+import os
+import copy
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+from flashcard_ai.metrics import inc
+
+# Single-flight configuration (can be overridden from the environment)
+SINGLEFLIGHT_ENABLED = os.environ.get('FLASHCARD_SINGLEFLIGHT', 'true') == 'true'
+# Lock table shared by every worker on the host; set it to an empty string to only coalesce within a process
+SINGLEFLIGHT_PATH = os.environ.get('FLASHCARD_SINGLEFLIGHT_PATH', os.path.join(tempfile.gettempdir(), 'flashcard_singleflight.db'))
+SINGLEFLIGHT_WAIT = float(os.environ.get('FLASHCARD_SINGLEFLIGHT_WAIT', 150))
+SINGLEFLIGHT_LOCK_TTL = float(os.environ.get('FLASHCARD_SINGLEFLIGHT_LOCK_TTL', 180))
+# Finished results are only kept long enough for the waiting workers to pick them up
+SINGLEFLIGHT_RESULT_TTL = float(os.environ.get('FLASHCARD_SINGLEFLIGHT_RESULT_TTL', 5))
+POLL_INTERVAL = 0.1
+
+_PENDING = object()
+_GONE = object()
+
+class _Call:
+    """A call in progress in this process, which other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+class LockStore:
+    """
+    SQLite table of in-flight calls, shared by every worker process on the host
+
+    A row is a lease held by the worker making the call. Once the call
+    finishes the worker stores its result in the row, where the workers
+    polling for it pick it up. Leases expire, so a worker that dies
+    mid-call can't block the key for good.
+    """
+
+    def __init__(self, path=SINGLEFLIGHT_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS singleflight ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL, result TEXT)"
+            )
+
+    def _connect(self):
+        # SQLite connections can't be shared between threads, keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key, owner, ttl=SINGLEFLIGHT_LOCK_TTL):
+        """Take the lease on a key; returns False if another worker holds it"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM singleflight WHERE expires_at < ?", (now,))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO singleflight (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + ttl)
+            )
+            return cursor.rowcount == 1
+
+    def publish(self, key, owner, result, ttl=SINGLEFLIGHT_RESULT_TTL):
+        """Store the result for the waiting workers"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE singleflight SET result = ?, expires_at = ? WHERE key = ? AND owner = ?",
+                (json.dumps(result), time.time() + ttl, key, owner)
+            )
+
+    def release(self, key, owner):
+        """Give up the lease without a result, so a waiting worker can take over"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM singleflight WHERE key = ? AND owner = ? AND result IS NULL", (key, owner))
+
+    def poll(self, key):
+        """
+        Look at a key held by another worker
+
+        Returns:
+            The published result (which may be None), _PENDING while the
+            call is still running, or _GONE if nobody holds the key any more
+        """
+        row = self._connect().execute(
+            "SELECT result, expires_at FROM singleflight WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return _GONE
+        if row[0] is None:
+            return _PENDING
+        return json.loads(row[0])
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_lock_store():
+    """Get the shared lock store, or None when cross-process coalescing is off or unavailable"""
+    global _store
+    if not SINGLEFLIGHT_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = LockStore()
+            except sqlite3.Error as e:
+                print(f"Error opening single-flight lock store, coalescing within this process only: {e}")
+                return None
+        return _store
+
+def _run_across_workers(key, func):
+    # Only one thread per process gets here for a key; now make it one per host
+    store = get_lock_store()
+    if store is None:
+        inc('singleflight_total', outcome='called')
+        return func()
+
+    owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+    deadline = time.monotonic() + SINGLEFLIGHT_WAIT
+    try:
+        while True:
+            if store.acquire(key, owner):
+                break
+            # Another worker is making the same call: wait for its result
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                state = store.poll(key)
+                if state is _GONE:
+                    break  # It gave up or died; try to take over
+                if state is not _PENDING:
+                    inc('singleflight_total', outcome='shared')
+                    return state
+            else:
+                inc('singleflight_total', outcome='timeout')
+                return func()
+    except sqlite3.Error as e:
+        print(f"Error coordinating with other workers, calling directly: {e}")
+        return func()
+
+    inc('singleflight_total', outcome='called')
+    try:
+        result = func()
+    except Exception:
+        try:
+            store.release(key, owner)
+        except sqlite3.Error as e:
+            print(f"Error releasing single-flight lock: {e}")
+        raise
+
+    try:
+        store.publish(key, owner, result)
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        # The waiting workers will find the lease gone and make the call themselves
+        print(f"Error publishing single-flight result: {e}")
+        try:
+            store.release(key, owner)
+        except sqlite3.Error:
+            pass
+    return result
+
+def single_flight(key, func):
+    """
+    Run func once for all concurrent callers with the same key
+
+    The first caller makes the call; callers that arrive while it is in
+    flight, in this process or in another worker, wait for it and get a
+    copy of its result instead of making the same call again. Results are
+    only held for a few seconds for other workers to collect, so this never
+    serves stale data; caching finished results is left to the caller.
+
+    Args:
+        key (str): Key identifying identical calls, e.g. from make_key
+        func (callable): Function to run; its result must be JSON-serialisable
+
+    Returns:
+        The result of func
+    """
+    if not SINGLEFLIGHT_ENABLED:
+        return func()
+
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        inc('singleflight_total', outcome='coalesced')
+        if not call.done.wait(SINGLEFLIGHT_WAIT):
+            inc('singleflight_total', outcome='timeout')
+            return func()
+        if call.error is not None:
+            raise call.error
+        # Every caller gets its own copy to modify
+        return copy.deepcopy(call.result)
+
+    try:
+        call.result = _run_across_workers(key, func)
+        return copy.deepcopy(call.result)
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.done.set()
@@ -0,0 +1,95 @@
+import json
+
+class CardStreamParser:
+    """
+    Incremental parser for flashcard JSON as the model streams it
+
+    Expects output shaped like {"main": [{"question": ..., "answer": ...}], ...}
+    and returns each card as soon as its closing brace arrives, without
+    waiting for the rest of the response. Anything before the first '{'
+    (such as a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_key = None
+        self.section = None
+        self.card_start = None
+
+    def feed(self, data):
+        """
+        Feed the next piece of streamed text
+
+        Args:
+            data (str): Next piece of model output
+
+        Returns:
+            list: (section, card) tuples for every card completed by this piece
+        """
+        if not data:
+            return []
+
+        self.text += data
+        cards = []
+
+        while self.pos < len(self.text):
+            i = self.pos
+            ch = self.text[i]
+            self.pos += 1
+
+            if not self.started:
+                if ch == '{':
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    # Strings directly inside the top-level object are section names
+                    if self.depth == 1:
+                        try:
+                            self.last_key = json.loads(self.text[self.string_start:i + 1])
+                        except ValueError:
+                            self.last_key = None
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch in '{[':
+                if ch == '[' and self.depth == 1:
+                    self.section = self.last_key
+                elif ch == '{' and self.depth == 2:
+                    self.card_start = i
+                self.depth += 1
+            elif ch in '}]':
+                self.depth -= 1
+                if ch == '}' and self.depth == 2 and self.card_start is not None:
+                    card = self._parse_card(self.text[self.card_start:i + 1])
+                    self.card_start = None
+                    if card is not None:
+                        cards.append((self.section, card))
+                elif ch == ']' and self.depth == 1:
+                    self.section = None
+
+        return cards
+
+    def _parse_card(self, raw):
+        try:
+            card = json.loads(raw)
+        except ValueError:
+            return None
+        if not isinstance(card, dict):
+            return None
+        return card
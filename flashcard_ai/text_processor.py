@@ -1,36 +1,151 @@
 import re
+import html
+from flashcard_ai.metrics import timer
 
-def process_text(text, format_type='plain'):
+# Paragraphs this short are usually stray headers, page numbers or captions
+MIN_PARAGRAPH_LENGTH = 20
+
+# Patterns are compiled once and each runs at most once per paragraph
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)[\s#]*$')
+_MARKDOWN_INLINE = re.compile(
+    r'!?\[([^\]]*)\]\([^)]*\)'               # links and images -> their text
+    r'|\*\*(?!\s)(.+?)(?<!\s)\*\*'           # bold
+    r'|__(?!\s)(.+?)(?<!\s)__'
+    r'|\*(?!\s)(.+?)(?<!\s)\*'               # italic, but not "* " list markers
+    r'|`([^`]+)`'                            # inline code
+)
+_HTML = re.compile(
+    r'<(script|style|noscript|template)\b.*?</\1\s*>'                    # dropped with their content
+    r'|<!--.*?-->'
+    r'|<(/?)(h[1-6]|p|div|br|li|ul|ol|tr|table|section|article|blockquote|pre|header|footer|main|aside|nav)\b[^>]*>'
+    r'|<[^>]*>',
+    re.IGNORECASE | re.DOTALL
+)
+
+def _markdown_inline(match):
+    # Exactly one group matched; keep its text without the markup
+    return next(group for group in match.groups() if group is not None)
+
+def _html_tag(match):
+    tag = match.group(3)
+    if tag is None:
+        return ''
+    tag = tag.lower()
+    # Opening heading tags become markdown headings so the structure survives
+    if tag[0] == 'h' and tag[1:].isdigit() and not match.group(2):
+        return '\n\n' + '#' * int(tag[1]) + ' '
+    # A line break continues the paragraph, every other block ends it
+    if tag == 'br':
+        return '\n'
+    return '\n\n'
+
+def html_to_text(markup):
     """
-    Process raw text input to prepare it for flashcard generation.
+    Convert HTML to plain text with blank lines between blocks
     
     Args:
-        text (str): Raw text input from the user
-        format_type (str): Type of input format ('plain', 'markdown', 'url')
-        
+        markup (str): HTML source
+    
     Returns:
-        str: Processed text ready for flashcard generation
+        str: Text with tags removed; headings are kept as markdown headings
+    """
+    return _HTML.sub(_html_tag, markup)
+
+def _iter_lines(pieces):
+    # Lines may be split across pieces, so carry the unfinished one over
+    rest = ''
+    for piece in pieces:
+        lines = (rest + piece).split('\n')
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+def iter_paragraphs(pieces, format_type='plain', min_length=MIN_PARAGRAPH_LENGTH):
+    """
+    Normalise text in a single pass, yielding one clean paragraph at a time
+    
+    Blank lines separate paragraphs; whitespace inside a paragraph is
+    collapsed to single spaces and paragraphs of min_length characters or
+    fewer are dropped. Markdown and HTML headings are kept as
+    "# Heading" paragraphs so chunking can still split on them.
+    
+    Args:
+        pieces: Text, or an iterable of text pieces (e.g. read from a file)
+        format_type (str): Type of input format ('plain', 'markdown', 'html', 'url')
+        min_length (int): Paragraphs this long or shorter are dropped
+    
+    Yields:
+        str: Normalised paragraphs, in order
     """
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    if isinstance(pieces, str):
+        pieces = (pieces,)
     
-    # Split text into paragraphs
-    paragraphs = text.split('\n\n')
+    is_markdown = format_type == 'markdown'
+    is_html = format_type == 'html'
+    if is_html:
+        # Tags can span pieces, so HTML is converted in one go
+        pieces = (html_to_text(''.join(pieces)),)
     
-    # Remove very short paragraphs (likely not content-rich)
-    paragraphs = [p for p in paragraphs if len(p) > 20]
+    lines = []
     
-    # Join the paragraphs back
-    processed_text = '\n\n'.join(paragraphs)
+    def finish():
+        paragraph = ' '.join(' '.join(lines).split())
+        lines.clear()
+        if is_markdown:
+            paragraph = _MARKDOWN_INLINE.sub(_markdown_inline, paragraph)
+        elif is_html:
+            paragraph = ' '.join(html.unescape(paragraph).split())
+        return paragraph if len(paragraph) > min_length else None
+    
+    for line in _iter_lines(pieces):
+        stripped = line.strip()
+        
+        if not stripped:
+            if lines:
+                paragraph = finish()
+                if paragraph:
+                    yield paragraph
+            continue
+        
+        if (is_markdown or is_html) and stripped[0] == '#':
+            heading = _HEADING.match(stripped)
+            if heading:
+                if lines:
+                    paragraph = finish()
+                    if paragraph:
+                        yield paragraph
+                title = ' '.join(heading.group(2).split())
+                if is_markdown:
+                    title = _MARKDOWN_INLINE.sub(_markdown_inline, title)
+                elif is_html:
+                    title = html.unescape(title)
+                if title:
+                    yield heading.group(1) + ' ' + title
+                continue
+        
+        lines.append(stripped)
     
-    # For URLs, we would normally fetch content, but we'll skip that for simplicity
-    # If needed, you could add URL processing using the requests library
+    if lines:
+        paragraph = finish()
+        if paragraph:
+            yield paragraph
+
+def process_text(text, format_type='plain'):
+    """
+    Process raw text input to prepare it for flashcard generation.
     
-    # For markdown, we would strip markdown formatting
-    if format_type == 'markdown':
-        # Simple markdown cleanup (just a basic example)
-        processed_text = re.sub(r'#+ ', '', processed_text)  # Remove headings
-        processed_text = re.sub(r'\*\*(.*?)\*\*', r'\1', processed_text)  # Remove bold
-        processed_text = re.sub(r'\*(.*?)\*', r'\1', processed_text)  # Remove italic
+    Args:
+        text (str): Raw text input from the user
+        format_type (str): Type of input format ('plain', 'markdown', 'html', 'url')
     
-    return processed_text
\ No newline at end of file
+    Returns:
+        str: Processed text ready for flashcard generation
+    """
+    with timer('process_text', format=format_type):
+        # For URLs, fetch the pages and use their main content, already normalised
+        if format_type == 'url':
+            from flashcard_ai.url_ingest import ingest_urls
+            return ingest_urls(text)
+        
+        return '\n\n'.join(iter_paragraphs(text, format_type))
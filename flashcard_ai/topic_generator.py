@@ -1,16 +1,109 @@
-import requests
-import re
 import os
-import json
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from openai import OpenAI
+from urllib.parse import urlparse, parse_qs
+from flashcard_ai.cache import get_cache, make_key
+from flashcard_ai.llm_client import chat_completion
+from flashcard_ai.prompts import build_topic_prompts
+from flashcard_ai.chunker import truncate_to_tokens
+from flashcard_ai.concurrency import run_concurrently, CALL_TIMEOUT
+from flashcard_ai.response_parser import request_flashcards
+from flashcard_ai.singleflight import single_flight
+from flashcard_ai.web_fetch import fetch, HTML_PARSER, FETCH_POOL_SIZE, FETCH_TIMEOUT
 
-# Load environment variables
-load_dotenv()
+# Shared cache of generated topic flashcards, keyed by topic and options
+generation_cache = get_cache('topic_flashcards')
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def duckduckgo_search(query, num_results):
+    """
+    Search DuckDuckGo's HTML interface
+    
+    Args:
+        query (str): Search query
+        num_results (int): Maximum number of results to return
+        
+    Returns:
+        list: Results as dicts with 'url' and 'snippet' keys
+    """
+    html = fetch("https://html.duckduckgo.com/html/", params={'q': query})
+    if html is None:
+        return []
+    
+    # Only parse the result blocks, not the whole page
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer('div', class_='result__body'))
+    
+    results = []
+    for result in soup.find_all('div', class_='result__body')[:num_results]:
+        snippet = result.find('a', class_='result__snippet')
+        link = result.find('a', class_='result__url')
+        
+        url = link['href'] if link and link.has_attr('href') else None
+        if url and url.startswith('//'):
+            url = 'https:' + url
+        if url:
+            # Result links go through a DuckDuckGo redirect, use the real target
+            target = parse_qs(urlparse(url).query).get('uddg')
+            if target:
+                url = target[0]
+        
+        results.append({
+            'url': url,
+            'snippet': snippet.text.strip() if snippet else ''
+        })
+    
+    return results
+
+# Search backends by name; register a stub here to run without network access
+SEARCH_BACKENDS = {
+    'duckduckgo': duckduckgo_search,
+    'none': lambda query, num_results: []
+}
+
+def register_search_backend(name, backend):
+    """
+    Register a search backend
+    
+    Args:
+        name (str): Name used to select the backend (FLASHCARD_SEARCH_BACKEND)
+        backend (callable): Function (query, num_results) -> list of {'url', 'snippet'} dicts
+    """
+    SEARCH_BACKENDS[name] = backend
+
+def get_search_backend():
+    """Get the configured search backend, defaulting to DuckDuckGo"""
+    name = os.environ.get('FLASHCARD_SEARCH_BACKEND', 'duckduckgo')
+    return SEARCH_BACKENDS.get(name, duckduckgo_search)
+
+def fetch_relevant_paragraphs(url, topic, limit=2):
+    """
+    Fetch a page and pick out substantial paragraphs that mention the topic
+    
+    Args:
+        url (str): Page URL
+        topic (str): Topic the paragraphs should mention
+        limit (int): Maximum number of paragraphs to return
+        
+    Returns:
+        list: Relevant paragraph texts
+    """
+    html = fetch(url)
+    if not html:
+        return []
+    
+    # Only parse paragraphs, scripts and styles are never built
+    from bs4 import BeautifulSoup, SoupStrainer
+    page_soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer('p'))
+    
+    relevant_paragraphs = []
+    for p in page_soup.find_all('p'):
+        p_text = p.get_text().strip()
+        # Only include substantial paragraphs
+        if len(p_text) > 100 and topic.lower() in p_text.lower():
+            relevant_paragraphs.append(p_text)
+            # Add up to 2 relevant paragraphs to save memory
+            if len(relevant_paragraphs) >= limit:
+                break
+    
+    return relevant_paragraphs
 
 def search_topic(topic, num_results=2):
     """
@@ -27,67 +120,24 @@ def search_topic(topic, num_results=2):
         # Create a search query
         search_query = f"{topic} facts information overview"
         
-        # Make a request to a search engine
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Using DuckDuckGo's HTML response
-        response = requests.get(
-            f"https://html.duckduckgo.com/html/?q={search_query.replace(' ', '+')}",
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            return f"Error searching for information: HTTP {response.status_code}"
+        results = get_search_backend()(search_query, num_results)
         
-        # Parse the HTML response
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Download all result pages at the same time rather than one by one
+        page_urls = [result['url'] for result in results if result.get('url')]
+        page_paragraphs = dict(zip(page_urls, run_concurrently(
+            lambda url: fetch_relevant_paragraphs(url, topic),
+            page_urls,
+            max_workers=FETCH_POOL_SIZE,
+            timeout=FETCH_TIMEOUT * 2,
+            default=[]
+        )))
         
-        # Find search results
-        results = soup.find_all('div', class_='result__body')
-        
-        # Extract text from first few results
+        # Extract text from each result, keeping the search ranking order
         extracted_text = []
-        
-        for i, result in enumerate(results):
-            if i >= num_results:
-                break
-                
-            # Get the snippet text
-            snippet = result.find('a', class_='result__snippet')
-            if snippet:
-                extracted_text.append(snippet.text.strip())
-                
-            # Try to get more text from the link
-            link = result.find('a', class_='result__url')
-            if link and link.has_attr('href'):
-                try:
-                    page_url = link['href']
-                    page_response = requests.get(page_url, headers=headers, timeout=5)
-                    
-                    if page_response.status_code == 200:
-                        page_soup = BeautifulSoup(page_response.text, 'html.parser')
-                        
-                        # Remove script and style elements
-                        for script in page_soup(['script', 'style']):
-                            script.extract()
-                            
-                        # Get text from paragraphs
-                        paragraphs = page_soup.find_all('p')
-                        relevant_paragraphs = []
-                        
-                        for p in paragraphs:
-                            p_text = p.get_text().strip()
-                            # Only include substantial paragraphs
-                            if len(p_text) > 100 and topic.lower() in p_text.lower():
-                                relevant_paragraphs.append(p_text)
-                                
-                        # Add up to 2 relevant paragraphs to save memory
-                        extracted_text.extend(relevant_paragraphs[:2])
-                        
-                except Exception as e:
-                    print(f"Error fetching page content: {e}")
+        for result in results:
+            if result.get('snippet'):
+                extracted_text.append(result['snippet'])
+            extracted_text.extend(page_paragraphs.get(result.get('url'), []))
         
         # Combine all text
         combined_text = "\n\n".join(extracted_text)
@@ -96,9 +146,8 @@ def search_topic(topic, num_results=2):
         if len(combined_text) < 500:
             combined_text += f"\n\n{topic} is an important subject that has various key aspects worth studying. Understanding {topic} requires examining its main components and historical context."
         
-        # Limit text length to avoid excessive tokens
-        if len(combined_text) > 4000:
-            combined_text = combined_text[:4000]
+        # Limit text to the per-request token budget, keeping whole paragraphs
+        combined_text = truncate_to_tokens(combined_text)
             
         return combined_text
         
@@ -121,6 +170,25 @@ def generate_topic_flashcards(topic, difficulty='easy', include_definitions=True
     Returns:
         dict: Dictionary containing different types of flashcards
     """
+    # Popular topics are requested over and over, so reuse earlier results
+    cache_key = make_key('topic_flashcards', topic, difficulty, include_definitions, include_facts, include_dates, model)
+    cached = generation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # A whole class asking for the same topic at once shares one search and one API call
+    return single_flight(
+        cache_key,
+        lambda: _generate_topic_flashcards(cache_key, topic, difficulty, include_definitions, include_facts, include_dates, model)
+    )
+
+def _generate_topic_flashcards(cache_key, topic, difficulty, include_definitions, include_facts, include_dates, model):
+    """Search and call the model for generate_topic_flashcards, caching real results under cache_key"""
+    # Another worker may have finished the same call just before this one started
+    cached = generation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
         # Skip scraping if user just wants AI-generated content
         if include_facts:
@@ -130,96 +198,31 @@ def generate_topic_flashcards(topic, difficulty='easy', include_definitions=True
             # Just use the topic name for pure AI generation
             topic_text = f"Generate flashcards about {topic}."
         
-        # Determine number of cards based on difficulty
-        if difficulty == 'easy':
-            num_cards = 5
-        elif difficulty == 'medium':
-            num_cards = 8
-        else:  # hard
-            num_cards = 10
+        # Prompts are precompiled per combination of options
+        system_prompt, user_prompt = build_topic_prompts(
+            topic,
+            topic_text,
+            difficulty=difficulty,
+            include_definitions=include_definitions,
+            include_facts=include_facts,
+            include_dates=include_dates
+        )
         
-        # Create flashcard types
-        card_types = []
-        if include_facts:
-            card_types.append("fact-based question-answer pairs")
-        if include_definitions:
-            card_types.append("key term definitions")
-        if include_dates:
-            card_types.append("important dates and timeline events")
-        
-        # Default if nothing is selected
-        if not card_types:
-            card_types = ["general knowledge question-answer pairs"]
-        
-        # Create enhanced prompts for GPT-4
-        system_prompt = """
-        You are an expert educator who creates high-quality flashcards about specific topics.
-        Your goal is to create effective study materials that help users learn important concepts.
-        
-        IMPORTANT: You must generate the flashcards in the SAME LANGUAGE as the topic input.
-        If the topic is in French, create French flashcards. If it's in Spanish, create Spanish flashcards, etc.
-        Never translate the content to another language - maintain the original language throughout.
-        
-        Guidelines for creating excellent flashcards:
-        1. Each card should focus on a single concept or fact
-        2. Questions should be clear and promote critical thinking
-        3. Answers should be comprehensive yet concise
-        4. Prioritize understanding over memorization
-        5. Create flashcards that build upon each other in complexity
-        6. Ensure factual accuracy and clarity in all cards
-        """
-        
-        user_prompt = f"""
-        Please create {num_cards} flashcards about the topic: {topic}
-        Difficulty level: {difficulty}
-        
-        Include these card types: {', '.join(card_types)}.
-        
-        Format your response as a JSON object with these keys:
-        - "main": A list of question-answer flashcards with "question" and "answer" keys
-        - "definitions": A list of term definition flashcards (if requested)
-        - "cloze": A list of fill-in-the-blank flashcards (if requested)
-        
-        Each list should contain objects with "question" and "answer" keys.
-        Make the content concise, clear, and focused on the most important concepts.
-        
-        IMPORTANT:
-        - Generate all flashcards in the SAME LANGUAGE as the topic input
-        - DO NOT translate the content to another language
-        - For {difficulty} difficulty, ensure appropriate complexity: {'basic recall for beginners' if difficulty == 'easy' else 'deeper understanding and connections' if difficulty == 'medium' else 'advanced application and critical thinking'}
-        
-        Use this information if relevant:
-        {topic_text}
-        """
-        
-        # Call the OpenAI API using the new client format
-        response = client.chat.completions.create(
+        # Call the OpenAI API and parse the cards out of the response
+        flashcards = request_flashcards(
+            chat_completion,
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.7,
-            max_tokens=2000
+            max_tokens=2000,
+            timeout=CALL_TIMEOUT
         )
         
-        # Extract and parse the content from the new response format
-        content = response.choices[0].message.content
-        
-        # Clean up the response to ensure it's valid JSON
-        content = content.strip()
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        try:
-            # Parse the JSON
-            flashcards = json.loads(content)
-        except json.JSONDecodeError:
-            # If JSON parsing fails, create a simple fallback response
-            print(f"Error parsing JSON response: {content[:100]}...")
+        if flashcards is None:
+            # If no usable cards came back, create a simple fallback response
             return {
                 "main": [
                     {"question": f"What is {topic}?", 
@@ -237,6 +240,8 @@ def generate_topic_flashcards(topic, difficulty='easy', include_definitions=True
         if include_dates and "dates" not in flashcards:
             flashcards["dates"] = []
         
+        generation_cache.set(cache_key, flashcards)
+        
         return flashcards
         
     except Exception as e:
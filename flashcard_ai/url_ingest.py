@@ -0,0 +1,239 @@
+import os
+import re
+import time
+import socket
+import threading
+import ipaddress
+from urllib.parse import urljoin, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+from flashcard_ai.cache import get_cache
+from flashcard_ai.concurrency import run_concurrently
+from flashcard_ai.text_processor import iter_paragraphs
+from flashcard_ai.web_fetch import HTML_PARSER, FETCH_POOL_SIZE, USER_AGENT
+
+# URL ingestion configuration (can be overridden from the environment)
+URL_MAX_BYTES = int(os.environ.get('FLASHCARD_URL_MAX_BYTES', 5 * 1024 * 1024))
+URL_TIMEOUT = float(os.environ.get('FLASHCARD_URL_TIMEOUT', 10))
+URL_CACHE_TTL = int(os.environ.get('FLASHCARD_URL_CACHE_TTL', 3600))
+URL_MAX_URLS = int(os.environ.get('FLASHCARD_URL_MAX_URLS', 5))
+URL_MAX_REDIRECTS = 5
+
+_URL = re.compile(r'https?://\S+')
+_BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'template', 'nav', 'header', 'footer', 'aside', 'form', 'iframe', 'svg']
+_BOILERPLATE_HINTS = re.compile(r'comment|sidebar|footer|header|menu|nav|share|social|related|advert|promo|cookie|banner', re.IGNORECASE)
+
+class URLIngestError(ValueError):
+    """Raised when no usable text could be read from the given URLs"""
+
+def find_urls(text):
+    """
+    Find the URLs in user input
+
+    Args:
+        text (str): Input containing one or more URLs
+
+    Returns:
+        list: Unique URLs in the order they appear
+    """
+    urls = []
+    for url in _URL.findall(text or ''):
+        url = url.rstrip('.,;:!?)]}>"\'')
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+def _resolve_public(url):
+    # Never let user input make the server fetch from its own network
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise URLIngestError(f"Unsupported URL: {url}")
+    try:
+        addresses = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80))
+    except socket.gaierror:
+        raise URLIngestError(f"Could not resolve {parsed.hostname}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0])
+        if not ip.is_global:
+            raise URLIngestError(f"Refusing to fetch non-public address {parsed.hostname}")
+    return addresses[0][4][0]
+
+class PublicAddressAdapter(HTTPAdapter):
+    """
+    Transport adapter that only connects to public addresses
+
+    The host name is resolved once per request, every address is checked,
+    and the connection goes to the address that was checked. Resolving it
+    again when connecting would let a DNS answer that changes in between
+    (DNS rebinding) point the request at the server's own network. TLS
+    still uses and verifies the real host name.
+    """
+
+    def get_connection(self, url, proxies=None):
+        # Proxies are ignored: going through one would bring back a second lookup
+        parsed = urlparse(url)
+        ip = _resolve_public(url)
+        pool_kwargs = {}
+        if parsed.scheme == 'https':
+            pool_kwargs = {'server_hostname': parsed.hostname, 'assert_hostname': parsed.hostname}
+        return self.poolmanager.connection_from_host(
+            ip, port=parsed.port or (443 if parsed.scheme == 'https' else 80), scheme=parsed.scheme, pool_kwargs=pool_kwargs
+        )
+
+    def add_headers(self, request, **kwargs):
+        # The connection is made to an IP address, so name the site explicitly
+        request.headers['Host'] = urlparse(request.url).netloc.rpartition('@')[2]
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_ingest_session():
+    """
+    Get the shared session for user-supplied URLs, which only reaches public addresses
+
+    Returns:
+        requests.Session: Session with pooled PublicAddressAdapter connections
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = PublicAddressAdapter(pool_connections=FETCH_POOL_SIZE, pool_maxsize=FETCH_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            # Proxy settings from the environment would bypass the address check
+            session.trust_env = False
+            _session = session
+        return _session
+
+def download(url, max_bytes=URL_MAX_BYTES, timeout=URL_TIMEOUT):
+    """
+    Download a page through the pooled session, streaming with a size limit
+
+    Redirects are followed by hand so every hop is checked to be a public address.
+
+    Args:
+        url (str): URL to download
+        max_bytes (int): Bytes to read at most; longer pages are cut off
+        timeout (float): Connect and read timeout in seconds
+
+    Returns:
+        str: Decoded page, or None if it isn't an HTML or text page
+    """
+    session = get_ingest_session()
+    for _ in range(URL_MAX_REDIRECTS + 1):
+        # The session's adapter checks the address of every hop before connecting
+        with session.get(url, stream=True, timeout=timeout, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                continue
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', 'text/html')
+            if 'html' not in content_type and not content_type.startswith('text/'):
+                print(f"Skipping {url}: unsupported content type {content_type}")
+                return None
+
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                print(f"{url} is {declared} bytes, reading the first {max_bytes}")
+
+            body = bytearray()
+            for block in response.iter_content(chunk_size=64 * 1024):
+                body.extend(block[:max_bytes - len(body)])
+                if len(body) >= max_bytes:
+                    break
+
+            encoding = response.encoding or response.apparent_encoding or 'utf-8'
+            return body.decode(encoding, errors='replace')
+
+    raise URLIngestError(f"Too many redirects for {url}")
+
+def _text_length(element):
+    return sum(len(p.get_text(' ', strip=True)) for p in element.find_all('p', recursive=False))
+
+def extract_main_content(markup):
+    """
+    Pick out the main article of a page, dropping navigation and other boilerplate
+
+    Uses <article> or <main> when the page has one, otherwise the element
+    whose own paragraphs hold the most text.
+
+    Args:
+        markup (str): Page HTML
+
+    Returns:
+        str: Article text as paragraphs separated by blank lines
+    """
+    soup = BeautifulSoup(markup, HTML_PARSER)
+
+    for element in soup(_BOILERPLATE_TAGS):
+        element.decompose()
+    for element in soup.find_all(attrs={'class': _BOILERPLATE_HINTS}) + soup.find_all(attrs={'id': _BOILERPLATE_HINTS}):
+        if element.name not in ('html', 'body', 'article', 'main') and not element.decomposed:
+            element.decompose()
+
+    candidates = soup.find_all(['article', 'main'])
+    if candidates:
+        main = max(candidates, key=lambda element: len(element.get_text()))
+    else:
+        parents = {id(p.parent): p.parent for p in soup.find_all('p') if p.parent is not None}
+        main = max(parents.values(), key=_text_length, default=None) or soup.body or soup
+
+    title = soup.title.get_text(strip=True) if soup.title else ''
+    text = '\n\n'.join(iter_paragraphs(str(main), 'html'))
+    if title and not text.startswith('#'):
+        text = f"# {title}\n\n{text}"
+    return text
+
+def fetch_article(url):
+    """
+    Fetch a URL and extract its main text, using the per-URL cache
+
+    Args:
+        url (str): URL of the article
+
+    Returns:
+        str: Extracted text, or '' if nothing usable was found
+    """
+    cache = get_cache('url_text')
+    entry = cache.get(url)
+    if entry is not None and time.time() - entry['fetched_at'] < URL_CACHE_TTL:
+        return entry['text']
+
+    markup = download(url)
+    text = extract_main_content(markup) if markup else ''
+    cache.set(url, {'text': text, 'fetched_at': time.time()})
+    return text
+
+def ingest_urls(text):
+    """
+    Replace URL input with the text of the pages it links to
+
+    Args:
+        text (str): Input containing one or more URLs
+
+    Returns:
+        str: Extracted text of every page, in input order
+
+    Raises:
+        URLIngestError: If the input has no URLs or none of them could be read
+    """
+    urls = find_urls(text)[:URL_MAX_URLS]
+    if not urls:
+        raise URLIngestError("No URL found in the input")
+
+    def fetch_one(url):
+        try:
+            return fetch_article(url)
+        except (requests.RequestException, URLIngestError) as e:
+            print(f"Error fetching {url}: {e}")
+            return ''
+
+    texts = run_concurrently(fetch_one, urls, max_workers=FETCH_POOL_SIZE, default='')
+    texts = [page for page in texts if page]
+    if not texts:
+        raise URLIngestError("Could not read any content from the given URL")
+    return '\n\n'.join(texts)
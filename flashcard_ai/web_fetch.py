@@ -0,0 +1,100 @@
+import os
+import time
+import threading
+import importlib.util
+from flashcard_ai.cache import get_cache, CACHE_BACKEND
+from flashcard_ai.metrics import timer
+
+# Fetch configuration (can be overridden from the environment)
+FETCH_TIMEOUT = float(os.environ.get('FLASHCARD_FETCH_TIMEOUT', 5))
+FETCH_CACHE_TTL = int(os.environ.get('FLASHCARD_FETCH_CACHE_TTL', 3600))
+FETCH_POOL_SIZE = int(os.environ.get('FLASHCARD_FETCH_POOL_SIZE', 10))
+FETCH_CACHE_MAX_BYTES = int(os.environ.get('FLASHCARD_FETCH_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Use lxml when it is installed, it is much faster than the built-in parser.
+# Only check that it exists; it is imported by BeautifulSoup when a page is parsed.
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Get the shared HTTP session, so connections are pooled and reused
+
+    Returns:
+        requests.Session: Session with keep-alive connection pools
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            # requests is only needed once something is fetched, not at start-up
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_POOL_SIZE, pool_maxsize=FETCH_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _session = session
+        return _session
+
+def fetch(url, params=None, timeout=FETCH_TIMEOUT, ttl=FETCH_CACHE_TTL):
+    """
+    Fetch a URL through the shared session and the per-URL response cache
+
+    Responses are served from the cache while fresh. Once stale they are
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged
+    page costs a 304 instead of a full download.
+
+    Args:
+        url (str): URL to fetch
+        params (dict): Optional query parameters
+        timeout (float): Request timeout in seconds
+        ttl (int): Seconds a cached response is used without revalidation
+
+    Returns:
+        str: Response body, or None if the page could not be fetched
+    """
+    import requests
+    # Whole pages are large: keep them in the size-bounded shared file, not in every worker's memory
+    cache = get_cache('web_pages', backend='none' if CACHE_BACKEND == 'none' else 'sqlite', max_bytes=FETCH_CACHE_MAX_BYTES)
+    cache_key = requests.Request('GET', url, params=params).prepare().url
+    entry = cache.get(cache_key)
+
+    if entry is not None and time.time() - entry['fetched_at'] < ttl:
+        return entry['body']
+
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        with timer('web_fetch'):
+            response = get_session().get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        # A stale copy is better than nothing
+        return entry['body'] if entry is not None else None
+
+    if response.status_code == 304 and entry is not None:
+        entry['fetched_at'] = time.time()
+        cache.set(cache_key, entry)
+        return entry['body']
+
+    if response.status_code != 200:
+        print(f"Error fetching {url}: HTTP {response.status_code}")
+        return None
+
+    cache.set(cache_key, {
+        'body': response.text,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'fetched_at': time.time()
+    })
+    return response.text
@@ -1,4 +1,28 @@
+import os
+import sys
+
 bind = "0.0.0.0:10000"
 workers = 2
 threads = 2
-timeout = 120
\ No newline at end of file
+timeout = 120
+
+# Load the app once in the master and fork the workers from it, so imports,
+# schema checks and deck migration run once and the loaded code is shared
+# copy-on-write instead of every worker paying for it at boot
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true') == 'true'
+
+def on_starting(server):
+    # Metrics files from a previous run would otherwise be added to the new workers' counts
+    from flashcard_ai.metrics import reset_metrics_dir
+    reset_metrics_dir()
+
+def post_fork(server, worker):
+    app_module = sys.modules.get('app')
+    if app_module is None:
+        return
+    # Connections opened by the master must not be shared across processes
+    with app_module.app.app_context():
+        app_module.db.engine.dispose(close=False)
+    # Start counting from zero rather than from what the master had recorded
+    from flashcard_ai.metrics import clear_metrics
+    clear_metrics()
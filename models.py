@@ -1,10 +1,32 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from datetime import datetime
 import json
+import time
+from flashcard_ai.metrics import observe
 
 db = SQLAlchemy()
 
+# Longest section name a card can be stored under
+SECTION_MAX_LENGTH = 20
+
+# Time every commit (flush included) as the db_commit stage
+@event.listens_for(Session, 'before_commit')
+def _start_commit_timer(session):
+    session.info['commit_started'] = time.perf_counter()
+
+@event.listens_for(Session, 'after_commit')
+def _record_commit_time(session):
+    started = session.info.pop('commit_started', None)
+    if started is not None:
+        observe('db_commit', time.perf_counter() - started)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_commit_timer(session):
+    session.info.pop('commit_started', None)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -19,12 +41,192 @@ class Deck(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_studied = db.Column(db.DateTime, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    cards_json = db.Column(db.Text, nullable=False)  # Store cards as JSON
-    
+    cards_json = db.deferred(db.Column(db.Text, nullable=False, default=''))  # Legacy JSON blob, emptied once cards move to the Card table
+    card_count = db.Column(db.Integer, nullable=False, default=0)
+    cards = db.relationship('Card', backref='deck', lazy='dynamic', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Serves the newest-first, keyset-paginated deck listing for a user
+        db.Index('ix_deck_user_created', 'user_id', 'created_at', 'id'),
+    )
+
     def get_cards(self):
-        """Convert JSON string to Python object"""
-        return json.loads(self.cards_json)
-    
+        """Build the {section: [cards]} dictionary from the deck's cards"""
+        # Decks that haven't been migrated yet still keep their cards in the blob
+        if self.cards_json:
+            return json.loads(self.cards_json)
+
+        result = {}
+        for card in self.cards.order_by(Card.position, Card.id):
+            result.setdefault(card.section, []).append(card.to_dict())
+        return result
+
+    def iter_cards(self, batch_size=500):
+        """
+        Iterate over the deck's cards without loading them all at once
+
+        Args:
+            batch_size (int): Number of rows fetched from the database at a time
+
+        Yields:
+            tuple: (section, question, answer) for each card, in deck order
+        """
+        if self.cards_json:
+            for section, section_cards in self.get_cards().items():
+                for card in section_cards if isinstance(section_cards, list) else []:
+                    if isinstance(card, dict):
+                        yield section, card.get('question', ''), card.get('answer', '')
+            return
+
+        # Sections come in the order they were saved, like get_cards, not alphabetically
+        sections = (db.session.query(Card.section)
+                    .filter(Card.deck_id == self.id)
+                    .group_by(Card.section)
+                    .order_by(db.func.min(Card.id)))
+        for section, in sections.all():
+            query = (db.session.query(Card.question, Card.answer)
+                     .filter(Card.deck_id == self.id, Card.section == section)
+                     .order_by(Card.position, Card.id)
+                     .execution_options(yield_per=batch_size))
+            for question, answer in query:
+                yield section, question, answer
+
     def set_cards(self, cards):
-        """Convert Python object to JSON string"""
-        self.cards_json = json.dumps(cards)
\ No newline at end of file
+        """
+        Replace the deck's cards with a {section: [cards]} dictionary
+
+        A plain list of cards, as older decks and imported files have, is
+        stored as the main section.
+
+        Raises:
+            ValueError: If cards is neither a dictionary nor a list
+        """
+        if isinstance(cards, list):
+            cards = {'main': cards}
+        if not isinstance(cards, dict):
+            raise ValueError("Cards must be a list or a dictionary of sections")
+
+        if self.id is not None:
+            Card.query.filter_by(deck_id=self.id).delete()
+
+        count = 0
+        positions = {}
+        for section, section_cards in cards.items():
+            if not isinstance(section_cards, list):
+                continue
+            # Longer names would fail to commit on databases that enforce the column length;
+            # sections that only differ after the cut are stored as one, in order
+            section = str(section)[:SECTION_MAX_LENGTH]
+            for card in section_cards:
+                if not isinstance(card, dict):
+                    continue
+                position = positions.get(section, 0)
+                positions[section] = position + 1
+                self.cards.append(Card(
+                    user_id=self.user_id,
+                    section=section,
+                    position=position,
+                    question=_card_text(card.get('question') or card.get('front')),
+                    answer=_card_text(card.get('answer') or card.get('back'))
+                ))
+                count += 1
+
+        self.card_count = count
+        self.cards_json = ''
+
+def _card_text(value):
+    # Card text columns only take strings; keep whatever else was sent readable instead of failing the save
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+class Card(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    deck_id = db.Column(db.Integer, db.ForeignKey('deck.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Copied from the deck so due cards can be found without a join
+    section = db.Column(db.String(SECTION_MAX_LENGTH), nullable=False, default='main')
+    position = db.Column(db.Integer, nullable=False, default=0)
+    question = db.Column(db.Text, nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+
+    # Study metadata
+    ease_factor = db.Column(db.Float, nullable=False, default=2.5)
+    interval = db.Column(db.Integer, nullable=False, default=0)  # days
+    repetitions = db.Column(db.Integer, nullable=False, default=0)
+    due_at = db.Column(db.DateTime, nullable=True)  # None until the first review
+    last_reviewed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_card_deck_section_position', 'deck_id', 'section', 'position'),
+        # Serves the "next due cards" query across all of a user's decks
+        db.Index('ix_card_user_due', 'user_id', 'due_at', 'id'),
+    )
+
+    def to_dict(self):
+        """Card as stored in the {section: [cards]} dictionary"""
+        return {'question': self.question, 'answer': self.answer}
+
+def ensure_schema():
+    """
+    Bring an existing database up to date with the models
+
+    db.create_all only creates missing tables, so columns and indexes added
+    to existing tables are created here.
+    """
+    inspector = db.inspect(db.engine)
+    deck_columns = {column['name'] for column in inspector.get_columns('deck')}
+
+    if 'card_count' not in deck_columns:
+        with db.engine.begin() as conn:
+            conn.execute(db.text("ALTER TABLE deck ADD COLUMN card_count INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(db.text(
+                "UPDATE deck SET card_count = (SELECT COUNT(*) FROM card WHERE card.deck_id = deck.id)"
+            ))
+
+    card_columns = {column['name'] for column in inspector.get_columns('card')}
+
+    if 'user_id' not in card_columns:
+        with db.engine.begin() as conn:
+            conn.execute(db.text('ALTER TABLE card ADD COLUMN user_id INTEGER REFERENCES "user" (id)'))
+            conn.execute(db.text(
+                "UPDATE card SET user_id = (SELECT deck.user_id FROM deck WHERE deck.id = card.deck_id)"
+            ))
+
+    for table in (Deck.__table__, Card.__table__):
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def migrate_deck_cards(batch_size=100):
+    """
+    Move cards out of legacy Deck.cards_json blobs into Card rows
+
+    Safe to run on every start-up: decks that were already migrated have
+    an empty blob and are skipped.
+
+    Args:
+        batch_size (int): Number of decks to migrate per commit
+
+    Returns:
+        int: Number of decks migrated
+    """
+    migrated = 0
+    while True:
+        decks = Deck.query.filter(Deck.cards_json != '').limit(batch_size).all()
+        if not decks:
+            break
+        for deck in decks:
+            try:
+                cards = json.loads(deck.cards_json)
+            except ValueError:
+                print(f"Skipping deck {deck.id} with unreadable cards")
+                cards = {}
+            deck.set_cards(cards if isinstance(cards, dict) else {'main': cards})
+            migrated += 1
+        db.session.commit()
+    return migrated
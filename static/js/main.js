@@ -287,16 +287,26 @@ modelOptions.forEach(option => {
             formData.append('create_cloze', createCloze);
             formData.append('question_answer', questionAnswer);
             formData.append('model', currentModel); // Add model paramater
-            fetch('/generate', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Server error');
-                }
-                return response.json();
-            })
+            formData.append('async', 'true');
+            
+            // Stream cards as they are generated where the browser supports it
+            const streamedCards = { main: [], definitions: [], cloze: [] };
+            const generation = window.ReadableStream
+                ? streamGeneration('/generate_stream', formData, (section, card) => {
+                    (streamedCards[section] = streamedCards[section] || []).push(card);
+                    
+                    // Show the results as soon as the first card arrives
+                    loadingSection.style.display = 'none';
+                    resultsSection.style.display = 'block';
+                    currentFlashcards = streamedCards;
+                    setupDeckTabs(streamedCards);
+                    
+                    const activeTab = deckTabs ? Array.from(deckTabs).find(tab => tab.classList.contains('active')) : null;
+                    displayFlashcards(currentFlashcards, activeTab ? activeTab.getAttribute('data-deck') : 'main');
+                })
+                : runGenerationJob('/generate', formData);
+            
+            generation
             .then(data => {
                 // Hide loading spinner
                 loadingSection.style.display = 'none';
@@ -357,17 +367,9 @@ modelOptions.forEach(option => {
             formData.append('include_facts', includeFacts);
             formData.append('include_dates', includeDates);
             formData.append('model', currentModel);  // Add model parameter
+            formData.append('async', 'true');
 
-            fetch('/generate_from_topic', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Server error');
-                }
-                return response.json();
-            })
+            runGenerationJob('/generate_from_topic', formData)
             .then(data => {
                 // Hide loading spinner
                 loadingSection.style.display = 'none';
@@ -426,17 +428,9 @@ modelOptions.forEach(option => {
             formData.append('use_ocr', useOcr);
             formData.append('difficulty', currentDifficulty);
             formData.append('model', currentModel);  // Add model parameter
+            formData.append('async', 'true');
 
-            fetch('/generate_from_files', {
-                method: 'POST',
-                body: formData
-            })
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Server error');
-                }
-                return response.json();
-            })
+            runGenerationJob('/generate_from_files', formData)
             .then(data => {
                 // Hide loading spinner
                 loadingSection.style.display = 'none';
@@ -469,6 +463,124 @@ modelOptions.forEach(option => {
         });
     }
     
+    // Submit a generation request as a background job and poll until it finishes
+    const JOB_POLL_LIMIT_MS = 10 * 60 * 1000;
+    
+    function runGenerationJob(url, formData) {
+        const loadingMessage = loadingSection.querySelector('p');
+        const defaultMessage = loadingMessage ? loadingMessage.textContent : '';
+        
+        return fetch(url, {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => {
+            if (!response.ok && response.status !== 202) {
+                throw new Error('Server error');
+            }
+            return response.json();
+        })
+        .then(data => {
+            // Older servers answer synchronously with the flashcards
+            if (!data.job_id) {
+                return data;
+            }
+            
+            return new Promise((resolve, reject) => {
+                const startedAt = Date.now();
+                const poll = () => {
+                    // Don't keep the spinner up forever if the job never finishes
+                    if (Date.now() - startedAt > JOB_POLL_LIMIT_MS) {
+                        if (loadingMessage) loadingMessage.textContent = defaultMessage;
+                        resolve({ error: 'Generation is taking too long, please try again' });
+                        return;
+                    }
+                    
+                    fetch(data.status_url)
+                    .then(response => {
+                        if (!response.ok) {
+                            throw new Error('Server error');
+                        }
+                        return response.json();
+                    })
+                    .then(job => {
+                        if (job.status === 'done') {
+                            if (loadingMessage) loadingMessage.textContent = defaultMessage;
+                            resolve(job.result);
+                        } else if (job.status === 'failed') {
+                            if (loadingMessage) loadingMessage.textContent = defaultMessage;
+                            resolve({ error: job.error || 'Generation failed' });
+                        } else {
+                            if (loadingMessage && job.message) {
+                                loadingMessage.textContent = job.message + '...';
+                            }
+                            setTimeout(poll, 1000);
+                        }
+                    })
+                    .catch(error => {
+                        if (loadingMessage) loadingMessage.textContent = defaultMessage;
+                        reject(error);
+                    });
+                };
+                poll();
+            });
+        });
+    }
+    
+    // Submit a generation request and read Server-Sent Events as cards arrive
+    function streamGeneration(url, formData, onCard) {
+        return fetch(url, {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => {
+            if (!response.ok || !response.body) {
+                throw new Error('Server error');
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let result = null;
+            
+            const handleEvent = (rawEvent) => {
+                let eventName = 'message';
+                let eventData = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        eventName = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        eventData += line.slice(5).trim();
+                    }
+                });
+                if (!eventData) return;
+                
+                const payload = JSON.parse(eventData);
+                if (eventName === 'card') {
+                    onCard(payload.section, payload.card);
+                } else if (eventName === 'done' || eventName === 'error') {
+                    result = payload;
+                }
+            };
+            
+            const read = () => reader.read().then(({ done, value }) => {
+                if (value) {
+                    buffer += decoder.decode(value, { stream: true });
+                    const events = buffer.split('\n\n');
+                    buffer = events.pop();
+                    events.forEach(handleEvent);
+                }
+                if (done) {
+                    if (buffer.trim()) handleEvent(buffer);
+                    return result || { error: 'Stream ended unexpectedly' };
+                }
+                return read();
+            });
+            
+            return read();
+        });
+    }
+    
     // Setup deck tabs
     function setupDeckTabs(data) {
         if (!deckTabs) return;
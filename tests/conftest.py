@@ -0,0 +1,13 @@
+import os
+import sys
+
+# The app's modules import from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep tests off the shared cache and lock files and away from the real API
+os.environ.setdefault('FLASHCARD_CACHE_BACKEND', 'memory')
+os.environ.setdefault('FLASHCARD_SINGLEFLIGHT_PATH', '')
+os.environ.setdefault('FLASHCARD_METRICS_DIR', '')
+os.environ.setdefault('FLASHCARD_REQUEST_LOG', 'false')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
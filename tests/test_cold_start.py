@@ -0,0 +1,13 @@
+import pytest
+from benchmarks import cold_start
+
+@pytest.fixture(scope='module')
+def summary():
+    return cold_start.measure(runs=3)
+
+def test_heavy_subsystems_load_on_first_use(summary):
+    assert summary['loaded'] == []
+
+def test_first_response_is_within_budget(summary):
+    # FLASHCARD_COLD_START_BUDGET raises the limit on slow CI machines
+    assert summary['first_response'] <= cold_start.COLD_START_BUDGET
@@ -0,0 +1,39 @@
+import io
+import pytest
+from flashcard_ai import file_processor
+from flashcard_ai.file_processor import TextBudget, extract_text_from_file
+
+TEXT = 'Mitochondria are the powerhouse of the cell. ' * 100
+
+@pytest.fixture
+def text_cache(monkeypatch):
+    cache = file_processor.get_cache('extracted_text', backend='memory')
+    cache.clear()
+    monkeypatch.setattr(file_processor, 'get_cache', lambda *args, **kwargs: cache)
+    return cache
+
+def upload():
+    return io.BytesIO(TEXT.encode('utf-8'))
+
+def cached_values(cache):
+    return [cache.get(key) for key in list(cache._entries)]
+
+def test_extracted_text_is_cached(text_cache):
+    assert extract_text_from_file(upload(), 'notes.txt') == TEXT
+    assert cached_values(text_cache) == [TEXT]
+    assert extract_text_from_file(upload(), 'notes.txt') == TEXT
+
+def test_truncated_text_is_charged_and_not_cached(text_cache):
+    budget = TextBudget(100)
+    assert extract_text_from_file(upload(), 'notes.txt', budget=budget) == TEXT[:100]
+    assert budget.remaining == 0
+    assert cached_values(text_cache) == []
+
+    # A later request with room for the whole file still gets all of it
+    assert extract_text_from_file(upload(), 'notes.txt', budget=TextBudget()) == TEXT
+
+def test_cached_text_is_charged_to_the_budget(text_cache):
+    extract_text_from_file(upload(), 'notes.txt')
+    budget = TextBudget(len(TEXT) + 10)
+    assert extract_text_from_file(upload(), 'notes.txt', budget=budget) == TEXT
+    assert budget.remaining == 10
@@ -0,0 +1,28 @@
+import json
+from types import SimpleNamespace
+from flashcard_ai import flashcard_generator
+from flashcard_ai.cache import make_key
+
+TEXT = 'Photosynthesis turns light into chemical energy.'
+DECK = {'main': [
+    {'question': 'What does photosynthesis produce?', 'answer': 'Chemical energy'},
+    {'question': 'What does photosynthesis produce?', 'answer': 'Chemical energy from light'},
+]}
+
+def fake_stream(**kwargs):
+    content = json.dumps(DECK)
+    for i in range(0, len(content), 7):
+        delta = SimpleNamespace(content=content[i:i + 7])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+def test_streamed_cards_are_cached_like_generated_ones(monkeypatch):
+    monkeypatch.setattr(flashcard_generator, 'chat_completion', fake_stream)
+    flashcard_generator.generation_cache.clear()
+
+    streamed = list(flashcard_generator.stream_flashcards(TEXT, extract_definitions=True, create_cloze=True))
+    assert len(streamed) == 1
+
+    cache_key = make_key('flashcards', TEXT, 'easy', True, True, True, 'gpt-3.5')
+    cached = flashcard_generator.generation_cache.get(cache_key)
+    assert cached == {'main': DECK['main'][:1], 'definitions': [], 'cloze': []}
+    assert flashcard_generator.generate_flashcards(TEXT, extract_definitions=True, create_cloze=True) == cached
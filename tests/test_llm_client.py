@@ -0,0 +1,154 @@
+import time
+import threading
+import openai
+import pytest
+from benchmarks.fake_openai import start_server
+from flashcard_ai import llm_client, metrics
+
+MESSAGES = [{'role': 'user', 'content': 'Make flashcards'}]
+
+@pytest.fixture(scope='module')
+def server():
+    server = start_server(latency=0.05, stream_delay=0)
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def api(server, monkeypatch):
+    """Point the shared client at the stub API, with a fresh limiter and breaker"""
+    server.failures.clear()
+    server.max_in_flight = 0
+    monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+    monkeypatch.setattr(llm_client, '_client', None)
+    monkeypatch.setattr(llm_client, '_breaker', llm_client.CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+    monkeypatch.setattr(llm_client, '_request_bucket', llm_client.TokenBucket(6000))
+    monkeypatch.setattr(llm_client, '_token_bucket', llm_client.TokenBucket(10 ** 7))
+    monkeypatch.setattr(llm_client, '_slots', threading.BoundedSemaphore(2))
+    monkeypatch.setattr(llm_client, 'LLM_BACKOFF_BASE', 0.01)
+    return server
+
+def call(**kwargs):
+    return llm_client.chat_completion(model='gpt-3.5-turbo', messages=MESSAGES, **kwargs)
+
+def counter(name, **labels):
+    return metrics._counters.get((name, metrics._labels(labels)), 0)
+
+def half_open():
+    # Open the circuit as if the reset timeout had already passed
+    breaker = llm_client._breaker
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    breaker.trial_in_flight = False
+
+def test_server_errors_and_rate_limits_are_retried(api):
+    api.failures.extend([429, 500])
+    before = api.requests
+    assert call().choices[0].message.content
+    assert api.requests - before == 3
+    assert llm_client._breaker.state == 'closed'
+
+def test_rejected_requests_are_not_retried(api):
+    api.failures.append(400)
+    before = api.requests
+    with pytest.raises(openai.BadRequestError):
+        call()
+    assert api.requests - before == 1
+
+def test_breaker_opens_fails_fast_and_recovers(api):
+    api.failures.extend([500] * 10)
+    before = api.requests
+    opened = counter('llm_circuit_opened_total')
+    rejected = counter('llm_rejected_total', reason='circuit_open')
+    with pytest.raises(llm_client.LLMUnavailableError):
+        call()
+    # The circuit opened after the third failure, before the retries ran out
+    assert api.requests - before == 3
+    assert llm_client._breaker.state == 'open'
+    assert counter('llm_circuit_opened_total') == opened + 1
+
+    # While open, calls are refused without reaching the API
+    with pytest.raises(llm_client.LLMUnavailableError):
+        call()
+    assert api.requests - before == 3
+    assert counter('llm_rejected_total', reason='circuit_open') == rejected + 2
+
+    api.failures.clear()
+    time.sleep(0.25)
+    assert llm_client._breaker.state == 'half-open'
+    call()
+    assert llm_client._breaker.state == 'closed'
+
+def bad_request(api, monkeypatch):
+    api.failures.append(400)
+    call()
+
+def rate_limited(api, monkeypatch):
+    bucket = llm_client._request_bucket
+    monkeypatch.setattr(bucket, 'tokens', -bucket.rate * (llm_client.LLM_MAX_WAIT + 60))
+    call()
+
+def no_free_slot(api, monkeypatch):
+    monkeypatch.setattr(llm_client, 'LLM_MAX_WAIT', 0.01)
+    slots = llm_client._slots
+    held = 0
+    while slots.acquire(blocking=False):
+        held += 1
+    try:
+        call()
+    finally:
+        for _ in range(held):
+            slots.release()
+
+def stream_abandoned(api, monkeypatch):
+    stream = iter(call(stream=True))
+    next(stream)
+    stream.close()
+
+@pytest.mark.parametrize('end_trial', [bad_request, rate_limited, no_free_slot, stream_abandoned])
+def test_half_open_trial_is_always_settled(api, end_trial):
+    half_open()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        try:
+            end_trial(api, monkeypatch)
+        except Exception:
+            # The trial call itself may fail; what matters is the breaker afterwards
+            pass
+
+    # A trial left marked in flight would refuse this call, and every one after it
+    call()
+
+def test_concurrent_calls_are_capped(api):
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert api.max_in_flight <= 2
+
+def test_token_bucket_makes_callers_wait_once_empty():
+    bucket = llm_client.TokenBucket(60)
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    bucket.refund(1)
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class FakeError(Exception):
+    def __init__(self, headers=None):
+        super().__init__('error')
+        self.response = FakeResponse(headers or {})
+
+def test_backoff_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(llm_client, 'LLM_BACKOFF_MAX', 20)
+    assert llm_client._backoff(0, FakeError({'retry-after': '3'})) == 3
+    assert llm_client._backoff(0, FakeError({'retry-after': '600'})) == 20
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(llm_client, 'LLM_BACKOFF_BASE', 0.5)
+    monkeypatch.setattr(llm_client, 'LLM_BACKOFF_MAX', 4)
+    delays = [llm_client._backoff(attempt, FakeError()) for attempt in range(10) for _ in range(20)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
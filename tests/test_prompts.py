@@ -0,0 +1,76 @@
+import pytest
+from flashcard_ai import prompts
+
+# Token cost of every prompt variant without the user's text or topic, as
+# counted by the built-in estimator. A change to a template changes these:
+# update the numbers only when the extra tokens are intended.
+EXPECTED_TOKENS = {
+    ('text', 'easy', False, False, False): 413,
+    ('text', 'easy', False, False, True): 485,
+    ('text', 'easy', False, True, False): 501,
+    ('text', 'easy', False, True, True): 593,
+    ('text', 'easy', True, False, False): 481,
+    ('text', 'easy', True, False, True): 573,
+    ('text', 'easy', True, True, False): 589,
+    ('text', 'easy', True, True, True): 680,
+    ('text', 'hard', False, False, False): 418,
+    ('text', 'hard', False, False, True): 489,
+    ('text', 'hard', False, True, False): 505,
+    ('text', 'hard', False, True, True): 597,
+    ('text', 'hard', True, False, False): 486,
+    ('text', 'hard', True, False, True): 577,
+    ('text', 'hard', True, True, False): 593,
+    ('text', 'hard', True, True, True): 685,
+    ('text', 'medium', False, False, False): 417,
+    ('text', 'medium', False, False, True): 489,
+    ('text', 'medium', False, True, False): 505,
+    ('text', 'medium', False, True, True): 596,
+    ('text', 'medium', True, False, False): 485,
+    ('text', 'medium', True, False, True): 577,
+    ('text', 'medium', True, True, False): 593,
+    ('text', 'medium', True, True, True): 684,
+    ('topic', 'easy', False, False, False): 407,
+    ('topic', 'easy', False, False, True): 406,
+    ('topic', 'easy', False, True, False): 405,
+    ('topic', 'easy', False, True, True): 414,
+    ('topic', 'easy', True, False, False): 402,
+    ('topic', 'easy', True, False, True): 411,
+    ('topic', 'easy', True, True, False): 411,
+    ('topic', 'easy', True, True, True): 420,
+    ('topic', 'hard', False, False, False): 411,
+    ('topic', 'hard', False, False, True): 410,
+    ('topic', 'hard', False, True, False): 409,
+    ('topic', 'hard', False, True, True): 419,
+    ('topic', 'hard', True, False, False): 406,
+    ('topic', 'hard', True, False, True): 416,
+    ('topic', 'hard', True, True, False): 415,
+    ('topic', 'hard', True, True, True): 424,
+    ('topic', 'medium', False, False, False): 410,
+    ('topic', 'medium', False, False, True): 409,
+    ('topic', 'medium', False, True, False): 409,
+    ('topic', 'medium', False, True, True): 418,
+    ('topic', 'medium', True, False, False): 406,
+    ('topic', 'medium', True, False, True): 415,
+    ('topic', 'medium', True, True, False): 414,
+    ('topic', 'medium', True, True, True): 423,
+}
+
+@pytest.fixture(autouse=True)
+def estimated_counts(monkeypatch):
+    # Count with the estimator whether or not tiktoken is installed, so the numbers are the same everywhere
+    monkeypatch.setattr(prompts, '_encoding', False)
+
+def test_prompt_token_counts_are_pinned():
+    assert prompts.prompt_token_counts() == EXPECTED_TOKENS
+
+def test_prompts_are_within_budget():
+    budgets = {'text': prompts.TEXT_PROMPT_BUDGET, 'topic': prompts.TOPIC_PROMPT_BUDGET}
+    for variant, tokens in EXPECTED_TOKENS.items():
+        assert tokens <= budgets[variant[0]], variant
+
+def test_unknown_difficulty_shares_the_hard_template():
+    prompts.text_prompt_template.cache_clear()
+    for difficulty in ('hard', 'HARD', 'extreme', ''):
+        system_prompt, user_prompt = prompts.build_text_prompts('text', difficulty)
+        assert 'Difficulty level: hard' in user_prompt
+    assert prompts.text_prompt_template.cache_info().currsize == 1
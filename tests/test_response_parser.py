@@ -0,0 +1,24 @@
+from flashcard_ai import metrics
+from flashcard_ai.response_parser import parse_flashcards
+
+def counter(name, **labels):
+    return metrics._counters.get((name, metrics._labels(labels)), 0)
+
+def test_parse_outcomes_are_counted():
+    parsed = counter('llm_responses_total', outcome='parsed')
+    salvaged = counter('llm_responses_total', outcome='salvaged')
+    failed = counter('llm_responses_total', outcome='failed')
+
+    assert parse_flashcards('{"main": [{"question": "Q", "answer": "A"}]}')
+    assert parse_flashcards('{"main": [{"question": "Q", "answer": "A"}, {"question": "Cut')
+    assert parse_flashcards('not json') is None
+
+    assert counter('llm_responses_total', outcome='parsed') == parsed + 1
+    assert counter('llm_responses_total', outcome='salvaged') == salvaged + 1
+    assert counter('llm_responses_total', outcome='failed') == failed + 1
+
+def test_invalid_cards_are_counted():
+    invalid = counter('llm_invalid_cards_total')
+    flashcards = parse_flashcards('{"main": [{"question": "Q", "answer": "A"}, {"question": ""}]}')
+    assert flashcards == {'main': [{'question': 'Q', 'answer': 'A'}]}
+    assert counter('llm_invalid_cards_total') == invalid + 1